@@ -0,0 +1,110 @@
+"""
+additive (linear) elementary rules.
+
+rules 60 (L xor C), 90 (L xor R), 102 (C xor R) and 150 (L xor C xor R), along with the
+trivial 0, 170, 204 and 240, are linear over GF(2): the next row is a sum of shifted
+copies of the current one, x' = p(S) x with S the shift by one cell. over GF(2)
+squaring is additive, so p(S)^(2^j) = p(S^(2^j)), and t generations take one
+"shift by 2^j and xor" round for every set bit j of t: O(n log t) word operations
+on a bit-packed row instead of t full steps. their complements (195, 165, 153, 105,
+...) are affine, x' = p(S) x xor 1, and jump just as fast.
+
+superposition -- the image of x xor y is the xor of the images -- is what makes a rule
+additive; superposition_holds checks it for any rule, at jump speed for these ones.
+"""
+from itertools import product
+
+import numpy as np
+
+from bitpack import PackedLattice
+
+
+def affine_form(rule_num):
+	"""
+	((a, b, c), d) with next = a*L xor b*C xor c*R xor d if rule_num has that form, else None.
+	"""
+	rule_num = int(rule_num)
+	if not 0 <= rule_num <= 255:
+		raise ValueError(f"elementary rule numbers lie in [0, 255], got {rule_num}")
+
+	for a, b, c, d in product((0, 1), repeat=4):
+		table = sum(((a & (i >> 2)) ^ (b & (i >> 1)) ^ (c & i) ^ d) << i for i in range(8))
+		if table == rule_num:
+			return (a, b, c), d
+
+	return None
+
+
+def is_additive(rule_num):
+	"""true for the 8 linear rules, whose images satisfy superposition."""
+	form = affine_form(rule_num)
+
+	return form is not None and form[1] == 0
+
+
+def jump_packed(lattice, rule_num, t):
+	"""the PackedLattice lattice after t generations of an affine rule."""
+	form = affine_form(rule_num)
+	if form is None:
+		raise ValueError(f"rule {rule_num} is not additive")
+	(a, b, c), d = form
+	t = int(t)
+	if t < 0:
+		raise ValueError(f"cannot go back in time, got t = {t}")
+
+	n = lattice.length
+	words = lattice.words.copy()
+	out = PackedLattice(words, n)
+
+	# p(S)^t x: for every set bit j of t, x <- a*S^(2^j) x xor b*x xor c*S^(-2^j) x
+	power = 1 % n
+	remaining = t
+	while remaining:
+		if remaining & 1:
+			step = np.zeros_like(words)
+			if a:
+				step ^= out.rotated(power)
+			if b:
+				step ^= words
+			if c:
+				step ^= out.rotated(-power)
+			words = step
+			out = PackedLattice(words, n)
+		remaining >>= 1
+		power = (2 * power) % n
+
+	# the constant: f^t(x) = p^t x xor (1 + p + ... + p^(t-1)) 1, and p 1 = (a xor b xor c) 1,
+	# so the sum is 1 once t > 0 when that parity is 0, and t mod 2 when it is 1
+	if d and t and ((a ^ b ^ c) == 0 or t % 2):
+		words = ~words
+		words[-1] &= out.tail_mask
+		out = PackedLattice(words, n)
+
+	return out
+
+
+def jump(cells, rule_num, t):
+	"""the periodic row cells after t generations of an affine rule, as uint8 cells."""
+	return jump_packed(PackedLattice.from_cells(cells), rule_num, t).to_cells()
+
+
+def superposition_holds(rule_num, x, y, t=1):
+	"""
+	whether t generations of rule_num map x xor y to the xor of the images of x and y.
+	affine rules jump; any other rule is stepped t times on the packed rows.
+	"""
+	x, y = PackedLattice.from_cells(x), PackedLattice.from_cells(y)
+	if x.length != y.length:
+		raise ValueError(f"rows of different lengths: {x.length} and {y.length}")
+	xy = PackedLattice(x.words ^ y.words, x.length)
+
+	if affine_form(rule_num) is not None:
+		images = [jump_packed(row, rule_num, t) for row in (x, y, xy)]
+	else:
+		images = []
+		for row in (x, y, xy):
+			for _ in range(int(t)):
+				row = row.step_eca(rule_num)
+			images.append(row)
+
+	return bool(np.array_equal(images[0].words ^ images[1].words, images[2].words))
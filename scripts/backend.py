@@ -0,0 +1,67 @@
+"""
+stepping backends, chosen at runtime.
+
+	numpy  kernels.py and the vectorized loop in ensemble.py; always available
+	numba  the compiled kernels of numba_kernels.py, which fuse the neighbour gather
+	       and rule lookup into one pass without temporaries (and, for GKL ensembles,
+	       run each IV to convergence in one compiled loop); only if numba is installed
+
+get_backend() returns the backend chosen with set_backend, else the one named by the
+CA_BACKEND environment variable, else numba when it is installed and numpy otherwise.
+asking for numba without numba installed falls back to numpy with a warning.
+"""
+import os
+import warnings
+
+import kernels
+import numba_kernels
+
+
+class Backend:
+
+	def __init__(self, name, eca_step, gkl_step, gkl_ensemble=None):
+		self.name = name
+		self.eca_step = eca_step
+		self.gkl_step = gkl_step
+		# (ivs, j, k, limit) -> (densities, steps), or None to use the loop in ensemble.py
+		self.gkl_ensemble = gkl_ensemble
+
+	def __repr__(self):
+		return f"Backend({self.name!r})"
+
+
+BACKENDS = {"numpy": Backend("numpy", kernels.eca_step, kernels.gkl_step)}
+if numba_kernels.available:
+	BACKENDS["numba"] = Backend("numba", numba_kernels.eca_step, numba_kernels.gkl_step, numba_kernels.gkl_ensemble)
+
+_selected = None
+
+
+def _resolve(name):
+	if name in (None, "", "auto"):
+		return BACKENDS.get("numba", BACKENDS["numpy"])
+	if name == "numba" and name not in BACKENDS:
+		warnings.warn("numba is not installed, using the numpy backend")
+		return BACKENDS["numpy"]
+	if name not in BACKENDS:
+		raise ValueError(f"unknown backend {name!r}, choose from auto, numpy, numba")
+
+	return BACKENDS[name]
+
+
+def set_backend(name):
+	"""select the backend ("auto", "numpy" or "numba") for the rest of the process."""
+	global _selected
+	_selected = _resolve(name)
+
+	return _selected
+
+
+def get_backend(name=None):
+	"""the backend called name, or the selected one (see the module docstring)."""
+	if name is not None:
+		return _resolve(name)
+	if _selected is None:
+		set_backend(os.environ.get("CA_BACKEND"))
+
+	return _selected
@@ -0,0 +1,199 @@
+"""
+non-interactive batch runs: many simulations from one job file, in one process.
+
+the job file has one JSON object per line (blank lines and lines starting with # are
+skipped), for example
+
+	{"id": "r110", "engine": "eca", "rule": 110, "iv": "random", "length": 400, "generations": 500, "trials": 20, "seed": 1}
+	{"engine": "eca", "rule": 30, "iv": "center", "length": 201, "generations": 100}
+	{"engine": "gkl", "j": 1, "k": 3, "iv": "density", "length": 149, "limit": 300, "trials": 1000}
+	{"engine": "gkl", "iv": "file", "path": "initialization_vectors_289.ivs", "start": 0, "trials": 5000}
+
+engine is "eca" (needs rule) or "gkl" (j and k, 1 and 3 by default). trials IVs of
+length cells come from iv:
+
+	random    cells 0 or 1 with equal odds (seed fixes them)
+	density   exactly int(density * length) ones at random places; without density,
+	          every trial draws its density uniformly from [0, 1]
+	center    only the middle cell is 1 (simulation.py's option b), inverted: only it is 0
+	file      rows start .. start + trials (all from start by default) of an IV store
+	          or old-style text file at path
+	"0110..." the cells themselves
+
+all trials of a job are evolved together (rulespace.evolve_rules for eca, with the
+transient and period of every trial; ensemble.run_ensemble for gkl, scored against the
+majority of every IV). rule tables are built once per process and IV files are read
+once and shared by every job that names them, so a file of small jobs costs little
+more than the simulations themselves. every job writes one JSON line as soon as it is
+done; a job that fails writes its error instead and the batch carries on.
+
+	python batch.py jobs.jsonl --out results.jsonl
+	python simulation.py --batch jobs.jsonl
+"""
+import argparse
+import json
+import sys
+import time
+
+import numpy as np
+
+from ensemble import run_ensemble
+from ivgen import exact_density_ivs
+from ivstore import load_ivs
+from rulespace import evolve_rules, first_repeat, state_hashes
+
+# IV files already read by this process, keyed by path
+_loaded_ivs = {}
+
+
+def read_jobs(f):
+	"""yield (line number, text) for every job line of a job file."""
+	for number, line in enumerate(f, 1):
+		line = line.strip()
+		if line and not line.startswith("#"):
+			yield number, line
+
+
+def parse_job(number, line):
+	# a job without an id is known by its line number
+	job = json.loads(line)
+	if not isinstance(job, dict):
+		raise ValueError(f"a job is a JSON object, got {line[:40]!r}")
+	job.setdefault("id", number)
+
+	return job
+
+
+def make_ivs(job):
+	"""the (trials, length) uint8 IVs a job asks for."""
+	source = job.get("iv", "random")
+	rng = np.random.default_rng(job.get("seed"))
+
+	if source == "file":
+		path = job["path"]
+		if path not in _loaded_ivs:
+			_loaded_ivs[path] = load_ivs(path)[0]
+		rows = _loaded_ivs[path]
+		start = int(job.get("start", 0))
+		trials = int(job.get("trials", len(rows) - start))
+		if not 0 <= start <= start + trials <= len(rows):
+			raise ValueError(f"{path} has {len(rows)} IVs, {trials} asked for from {start}")
+		return np.asarray(rows[start : start + trials], dtype=np.uint8)
+
+	trials = int(job.get("trials", 1))
+
+	if source and set(source) <= {"0", "1"}:
+		return np.tile(np.frombuffer(source.encode(), dtype=np.uint8) - ord("0"), (trials, 1))
+
+	length = int(job["length"])
+	if source == "random":
+		return rng.integers(0, 2, (trials, length), dtype=np.uint8)
+
+	if source == "density":
+		densities = [job["density"]] * trials if "density" in job else rng.uniform(0, 1, trials)
+		return exact_density_ivs(densities, length, rng)
+
+	if source in ("center", "inverted"):
+		ivs = np.zeros((trials, length), dtype=np.uint8)
+		ivs[:, length // 2 - 1] = 1
+		return ivs if source == "center" else 1 - ivs
+
+	raise ValueError(f"unknown iv source {source!r}")
+
+
+def run_eca_job(job, ivs):
+	rule, generations = int(job["rule"]), int(job.get("generations", 256))
+	states, history = evolve_rules(ivs, [rule], generations)
+	transient, period = first_repeat(state_hashes(history[:, 0]).T)
+
+	return {
+		"rule": rule,
+		"generations": generations,
+		"final_density": float(states.sum(dtype=np.int64) / states.size),
+		"transient": transient.tolist(),
+		"period": period.tolist(),
+	}
+
+
+def run_gkl_job(job, ivs):
+	j, k, limit = int(job.get("j", 1)), int(job.get("k", 3)), int(job.get("limit", 600))
+	densities, steps = run_ensemble(ivs, j, k, limit)
+
+	# IVs with as many 0s as 1s have no majority and are left out of the accuracy
+	ones = ivs.sum(axis=1, dtype=np.int64)
+	decided = 2 * ones != ivs.shape[1]
+	majority = (2 * ones > ivs.shape[1]).astype(np.float64)
+	correct = int(np.count_nonzero((densities == majority) & decided))
+	converged = steps < limit
+
+	return {
+		"j": j,
+		"k": k,
+		"limit": limit,
+		"accuracy": correct / int(decided.sum()) if decided.any() else None,
+		"converged": int(converged.sum()),
+		"steps_mean": float(steps[converged].mean()) if converged.any() else None,
+		"steps_max": int(steps[converged].max()) if converged.any() else None,
+		"ties": int((~decided).sum()),
+	}
+
+
+ENGINES = {"eca": run_eca_job, "gkl": run_gkl_job}
+
+
+def run_job(job):
+	"""the result line of one job."""
+	start = time.perf_counter()
+	engine = job.get("engine")
+	if engine not in ENGINES:
+		raise ValueError(f"unknown engine {engine!r}, choose from {', '.join(ENGINES)}")
+
+	ivs = make_ivs(job)
+	result = {"id": job["id"], "engine": engine, "trials": len(ivs), "length": ivs.shape[1]}
+	result.update(ENGINES[engine](job, ivs))
+	result["seconds"] = round(time.perf_counter() - start, 6)
+
+	return result
+
+
+def run_batch(lines, out):
+	"""
+	run the jobs of lines ((line number, text) pairs, see read_jobs) in turn, writing the
+	result (or error) of each to out as one JSON line. returns the number that failed.
+	"""
+	failed = 0
+	for number, line in lines:
+		job = {"id": number}
+		try:
+			job = parse_job(number, line)
+			result = run_job(job)
+		except Exception as e:
+			failed += 1
+			result = {"id": job["id"], "error": f"{type(e).__name__}: {e}"}
+		out.write(json.dumps(result) + "\n")
+		out.flush()
+
+	return failed
+
+
+def main(argv=None):
+	parser = argparse.ArgumentParser(description="run the simulations of a job file, one JSON result line per job")
+	parser.add_argument("jobs", help="job file, one JSON object per line (- for standard input)")
+	parser.add_argument("--out", help="JSON Lines file for the results (standard output by default)")
+	args = parser.parse_args(argv)
+
+	jobs_file = sys.stdin if args.jobs == "-" else open(args.jobs)
+	out = open(args.out, "w") if args.out else sys.stdout
+	try:
+		failed = run_batch(read_jobs(jobs_file), out)
+	finally:
+		if jobs_file is not sys.stdin:
+			jobs_file.close()
+		if out is not sys.stdout:
+			out.close()
+
+	return 1 if failed else 0
+
+
+if __name__ == "__main__":
+	sys.exit(main())
@@ -0,0 +1,227 @@
+"""
+benchmarks for the engines, the ensemble runner, IV generation/loading and rendering.
+
+	python benchmark.py                       run everything and print a table
+	python benchmark.py --quick               smaller sizes only
+	python benchmark.py --only gkl            cases whose name contains "gkl"
+	python benchmark.py --save base.json      store the results as a baseline
+	python benchmark.py --baseline base.json  compare against a stored baseline
+
+every case reports wall time (best of --repeat runs), cells processed per second and the
+peak memory traced during one extra run. with --baseline, cases slower than the baseline
+by more than --tolerance are flagged and the exit status is 1.
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+from kernels import rule_table, eca_step, gkl_table, lut_step
+from backend import BACKENDS, get_backend
+from bitpack import PackedLattice
+from domain import ThreadedStepper
+from dynamics import evolve
+from history import make_history
+from ensemble import run_ensemble
+from ivgen import generate_ivs, write_ivs
+from ivstore import IVStore
+from render import render_png
+
+# name -> (setup, quick), where setup() returns a run() that returns the number of cells it processed
+CASES = {}
+
+
+def case(name, quick=True):
+	def register(setup):
+		CASES[name] = (setup, quick)
+		return setup
+	return register
+
+
+def _row(n, seed=0):
+	return np.random.default_rng(seed).integers(0, 2, n, dtype=np.uint8)
+
+
+def _packed_row(n, seed=0):
+	return PackedLattice.from_cells(_row(n, seed))
+
+
+def _step_case(step, n, generations, init=_row):
+	def setup():
+		lattice = init(n)
+		# compiled kernels are compiled on their first call, which is not what is measured
+		step(init(64))
+
+		def run():
+			cur = lattice
+			for _ in range(generations):
+				cur = step(cur)
+			return n * generations
+
+		return run
+	return setup
+
+
+# the single-lattice kernels of every available backend (see backend.py), as the pages use them
+for n, quick in ((10**3, True), (10**5, True), (10**6, False)):
+	for name in BACKENDS:
+		backend = get_backend(name)
+		case(f"eca_step/{name}/n={n}", quick)(_step_case(lambda r, step=backend.eca_step: step(r, rule_table(110)), n, 100))
+		case(f"gkl_step/{name}/n={n}", quick)(_step_case(lambda r, step=backend.gkl_step: step(r, 1, 3), n, 100))
+	case(f"lut_gkl/n={n}", quick)(_step_case(lambda r: lut_step(r, gkl_table(1, 3), 3), n, 100))
+
+for n, quick in ((10**5, True), (10**7, False)):
+	case(f"packed_eca/n={n}", quick)(_step_case(lambda p: p.step_eca(110), n, 100, _packed_row))
+	case(f"packed_gkl/n={n}", quick)(_step_case(lambda p: p.step_gkl(1, 3), n, 100, _packed_row))
+
+
+@case("threaded_eca/n=10000000", quick=False)
+def threaded_eca():
+	# one ring shared by all cores, 10 generations between barriers
+	stepper = ThreadedStepper(lambda r: eca_step(r, rule_table(110)), 1, depth=10)
+	row = _row(10**7)
+
+	def run():
+		stepper.advance(row, 100)
+		return 10**7 * 100
+	return run
+
+
+def _eca_run(step):
+	# the Page2 default: a 500-generation history of a random 397-cell IV
+	def setup():
+		step(_row(64), rule_table(30))
+
+		def run():
+			history = make_history("dense", 500, 397)
+			history[0] = _row(397)
+			evolve(history, lambda prev, out=None: step(prev, rule_table(30), out=out))
+			return 397 * 500
+		return run
+	return setup
+
+
+for name in BACKENDS:
+	case(f"eca_run/{name}/397x500")(_eca_run(get_backend(name).eca_step))
+
+
+@case("ensemble/1000x149")
+def ensemble_small():
+	ivs = next(generate_ivs(1000, 149, (0.4, 0.6), seed=0, chunk_size=1000))[0]
+
+	def run():
+		_, steps = run_ensemble(ivs, 1, 3, 300)
+		return int(steps.sum()) * 149
+	return run
+
+
+@case("ensemble/10000x289", quick=False)
+def ensemble_large():
+	ivs = next(generate_ivs(10000, 289, (0.45, 0.55), seed=0, chunk_size=10000))[0]
+
+	def run():
+		_, steps = run_ensemble(ivs, 1, 3, 600)
+		return int(steps.sum()) * 289
+	return run
+
+
+@case("ivgen/100000x289")
+def ivgen():
+	def run():
+		for _ in generate_ivs(10**5, 289, seed=0):
+			pass
+		return 10**5 * 289
+	return run
+
+
+@case("ivstore/100000x289")
+def ivstore():
+	# write a store, then read it all back in batches
+	def run():
+		with tempfile.TemporaryDirectory(prefix="ca_bench_") as tmp:
+			path = os.path.join(tmp, "ivs.ivs")
+			write_ivs(path, 10**5, 289, seed=0)
+			for _ in IVStore(path).batches(10**4):
+				pass
+		return 10**5 * 289
+	return run
+
+
+@case("render/1000x10000")
+def render_small():
+	history = np.random.default_rng(0).integers(0, 2, (1000, 10**4), dtype=np.uint8)
+	return lambda: len(render_png(history)) and history.size
+
+
+@case("render/10000x100000", quick=False)
+def render_large():
+	history = np.random.default_rng(0).integers(0, 2, (10**4, 10**5), dtype=np.uint8)
+	return lambda: len(render_png(history)) and history.size
+
+
+def measure(setup, repeat):
+	run = setup()
+
+	best = float("inf")
+	for _ in range(repeat):
+		start = time.perf_counter()
+		cells = run()
+		best = min(best, time.perf_counter() - start)
+
+	tracemalloc.start()
+	run()
+	_, peak = tracemalloc.get_traced_memory()
+	tracemalloc.stop()
+
+	return {"seconds": best, "cells_per_sec": cells / best, "peak_mb": peak / 2**20}
+
+
+def main():
+	parser = argparse.ArgumentParser(description="benchmark the cellular automata engines")
+	parser.add_argument("--quick", action="store_true", help="skip the largest sizes")
+	parser.add_argument("--only", default="", help="only run cases whose name contains this")
+	parser.add_argument("--repeat", type=int, default=3, help="runs per case, the best is kept")
+	parser.add_argument("--save", help="write the results to this JSON file")
+	parser.add_argument("--baseline", help="compare against results saved with --save")
+	parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown against the baseline")
+	args = parser.parse_args()
+
+	baseline = {}
+	if args.baseline:
+		with open(args.baseline) as f:
+			baseline = json.load(f)
+
+	results, regressions = {}, []
+	print(f"{'case':<28}{'time (s)':>12}{'cells/s':>14}{'peak MB':>10}  vs baseline")
+
+	for name, (setup, quick) in CASES.items():
+		if (args.quick and not quick) or args.only not in name:
+			continue
+
+		r = results[name] = measure(setup, args.repeat)
+
+		note = ""
+		if name in baseline:
+			ratio = r["seconds"] / baseline[name]["seconds"]
+			note = f"{ratio:.2f}x"
+			if ratio > 1 + args.tolerance:
+				note += "  REGRESSION"
+				regressions.append(name)
+
+		print(f"{name:<28}{r['seconds']:>12.4f}{r['cells_per_sec']:>14.3g}{r['peak_mb']:>10.1f}  {note}")
+
+	if args.save:
+		with open(args.save, "w") as f:
+			json.dump(results, f, indent=1)
+
+	if regressions:
+		print(f"\n{len(regressions)} regression(s): {', '.join(regressions)}")
+		raise SystemExit(1)
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,197 @@
+"""
+bit-packed lattices: 64 cells per uint64 word.
+
+cell i of a ring of length n lives in bit i % 64 of word i // 64. neighbours are
+fetched by shifting the whole word array, carrying bits across word boundaries
+and patching the few bits that wrap around the ring, so every rule below is a
+boolean expression over whole words and one operation updates 64 cells.
+"""
+import numpy as np
+
+WORD = 64
+_ONES = np.uint64(0xFFFFFFFFFFFFFFFF)
+
+
+def pack(cells):
+	"""pack a 1-D array of 0/1 cells into uint64 words (the last word is zero padded)."""
+	cells = np.asarray(cells, dtype=np.uint8)
+	n_words = -(-len(cells) // WORD)
+
+	padded = np.zeros(n_words * WORD, dtype=np.uint8)
+	padded[:len(cells)] = cells
+
+	return np.packbits(padded, bitorder="little").view("<u8").astype(np.uint64)
+
+
+def unpack(words, length):
+	"""inverse of pack: the first length cells of the word array as uint8."""
+	raw = np.ascontiguousarray(words, dtype="<u8").view(np.uint8)
+
+	return np.unpackbits(raw, bitorder="little")[:length]
+
+
+def popcount(words):
+	"""total number of set bits in a word array."""
+	if hasattr(np, "bitwise_count"):
+		return int(np.bitwise_count(words).sum())
+
+	return int(np.unpackbits(np.ascontiguousarray(words).view(np.uint8)).sum())
+
+
+def _get_bits(words, start, count):
+	# count (< 64) consecutive bits starting at bit position start, as a python int
+	w, b = divmod(start, WORD)
+	value = int(words[w]) >> b
+	if b + count > WORD:
+		value |= int(words[w + 1]) << (WORD - b)
+
+	return value & ((1 << count) - 1)
+
+
+def _set_bits(words, start, count, value):
+	# overwrite count (< 64) consecutive bits starting at bit position start
+	w, b = divmod(start, WORD)
+	mask = ((1 << count) - 1) << b
+
+	low = mask & 0xFFFFFFFFFFFFFFFF
+	words[w] = np.uint64((int(words[w]) & ~low & 0xFFFFFFFFFFFFFFFF) | ((value << b) & low))
+	if mask >> WORD:
+		high = mask >> WORD
+		words[w + 1] = np.uint64((int(words[w + 1]) & ~high & 0xFFFFFFFFFFFFFFFF) | ((value >> (WORD - b)) & high))
+
+
+def _bit_range(words, start, count):
+	# count consecutive bits starting at bit position start, as a new word array
+	# (the last word zero padded)
+	w, b = divmod(start, WORD)
+	n_words = -(-count // WORD)
+
+	src = np.zeros(n_words + 1, dtype=np.uint64)
+	chunk = words[w : w + n_words + 1]
+	src[: len(chunk)] = chunk
+
+	out = src[:n_words] >> np.uint64(b)
+	if b:
+		out |= src[1:] << np.uint64(WORD - b)
+	if count % WORD:
+		out[-1] &= np.uint64((1 << (count % WORD)) - 1)
+
+	return out
+
+
+def _concat(a, a_count, b, b_count):
+	# the bits of a (a_count of them) followed by those of b
+	w, s = divmod(a_count, WORD)
+	out = np.zeros(-(-(a_count + b_count) // WORD), dtype=np.uint64)
+	out[: len(a)] = a
+
+	out[w : w + len(b)] |= (b << np.uint64(s))[: len(out) - w]
+	if s:
+		spill = (b >> np.uint64(WORD - s))[: len(out) - w - 1]
+		out[w + 1 : w + 1 + len(spill)] |= spill
+
+	return out
+
+
+class PackedLattice:
+	"""
+	a periodic 1-D lattice of 0/1 cells stored as packed uint64 words.
+	"""
+
+	def __init__(self, words, length):
+		self.words = words
+		self.length = length
+
+		# bits past the end of the ring in the last word are kept at zero
+		tail = length % WORD
+		self.tail_mask = np.uint64((1 << tail) - 1) if tail else _ONES
+
+	@classmethod
+	def from_cells(cls, cells):
+		return cls(pack(cells), len(cells))
+
+	def to_cells(self):
+		return unpack(self.words, self.length)
+
+	def count(self):
+		"""number of 1s on the ring."""
+		return popcount(self.words)
+
+	def density(self):
+		return self.count() / self.length
+
+	def shifted(self, s):
+		"""
+		word array whose cell i holds cell (i - s) mod length, i.e. the neighbour s places
+		to the left (s > 0) or -s places to the right (s < 0). requires 0 < |s| < min(64, length).
+		"""
+		n, w = self.length, self.words
+		if s == 0:
+			return w.copy()
+		if abs(s) >= WORD or abs(s) >= n:
+			raise ValueError(f"shifts must satisfy 0 < |s| < min(64, length), got {s}")
+
+		if s > 0:
+			out = (w << np.uint64(s)) | (np.roll(w, 1) >> np.uint64(WORD - s))
+			# the first s cells wrap around to the last s cells of the ring
+			_set_bits(out, 0, s, _get_bits(w, n - s, s))
+		else:
+			t = -s
+			out = (w >> np.uint64(t)) | (np.roll(w, -1) << np.uint64(WORD - t))
+			# the last t cells wrap around to the first t cells of the ring
+			_set_bits(out, n - t, t, _get_bits(w, 0, t))
+
+		return out
+
+	def rotated(self, s):
+		"""
+		word array whose cell i holds cell (i - s) mod length, for any shift s; slower per
+		call than shifted, but the cost does not depend on s.
+		"""
+		n = self.length
+		s %= n
+		if s == 0:
+			return self.words.copy()
+
+		# the last s cells move to the front, the others follow them
+		return _concat(_bit_range(self.words, n - s, s), s, _bit_range(self.words, 0, n - s), n - s)
+
+	def _finish(self, words):
+		words[-1] &= self.tail_mask
+		return PackedLattice(words, self.length)
+
+	def step_eca(self, rule_num):
+		"""
+		one generation of an elementary rule, written as the sum of products of the
+		neighbourhoods it maps to 1 (or the complement of those it maps to 0, if shorter).
+		"""
+		rule_num = int(rule_num)
+		if rule_num < 0 or rule_num > 255:
+			raise ValueError(f"elementary rule numbers lie in [0, 255], got {rule_num}")
+
+		C = self.words
+		L, R = self.shifted(1), self.shifted(-1)
+		lits = ((~L, L), (~C, C), (~R, R))
+
+		ones = [i for i in range(8) if (rule_num >> i) & 1]
+		invert = len(ones) > 4
+		terms = [i for i in range(8) if not (rule_num >> i) & 1] if invert else ones
+
+		out = np.zeros_like(C)
+		for i in terms:
+			out |= lits[0][(i >> 2) & 1] & lits[1][(i >> 1) & 1] & lits[2][i & 1]
+
+		if invert:
+			out = ~out
+
+		return self._finish(out)
+
+	def step_gkl(self, j=1, k=3):
+		"""
+		one generation of the (j, k) GKL rule, with the same orientation as kernels.gkl_step:
+		a 1 becomes (left_j | left_k), a 0 becomes (right_j & right_k).
+		"""
+		C = self.words
+		out = (C & (self.shifted(j) | self.shifted(k))) | (~C & self.shifted(-j) & self.shifted(-k))
+
+		return self._finish(out)
@@ -0,0 +1,164 @@
+"""
+early exit for single-lattice runs: fixed points and periodic orbits.
+
+evolve() fills a history (see history.py) row by row and watches the states go by with
+Brent's cycle detection, which only keeps one saved state (packed to bytes) around.
+once the run is known to repeat, the remaining rows are copied from the cycle
+instead of being stepped, and the transient length and period are reported.
+"""
+import numpy as np
+
+from instrument import NO_STATS
+
+# generations compared per block when looking for the start of a cycle
+_BLOCK = 4096
+
+
+class CycleDetector:
+	"""
+	Brent's algorithm over a stream of states: the saved state jumps to the newest
+	one whenever the distance to it reaches the next power of two, so a repeat is
+	caught within a few periods of entering the cycle.
+	"""
+
+	def __init__(self, row):
+		self.saved = np.packbits(row).tobytes()
+		self.power = 1
+		self.lam = 0
+
+	def push(self, row):
+		"""feed the next state; returns the period once the run is seen to repeat, else None."""
+		key = np.packbits(row).tobytes()
+		self.lam += 1
+
+		if key == self.saved:
+			return self.lam
+
+		if self.lam == self.power:
+			self.saved = key
+			self.power *= 2
+			self.lam = 0
+
+		return None
+
+
+def transient_length(history, gen, period, x0, step):
+	"""
+	first generation t with state(t) == state(t + period), given that gen is in the cycle.
+	rows are compared block by block while the history still holds generation 0, otherwise
+	the run is replayed from x0 with one copy period steps ahead of the other.
+	"""
+	if history.has(0):
+		end = gen - period + 1
+		for start in range(0, end, _BLOCK):
+			stop = min(start + _BLOCK, end)
+			same = np.all(history.rows(start, stop) == history.rows(start + period, stop + period), axis=1)
+			if same.any():
+				return start + int(np.argmax(same))
+
+	behind, ahead = x0.copy(), x0.copy()
+	for _ in range(period):
+		ahead = step(ahead)
+
+	transient = 0
+	while not np.array_equal(behind, ahead):
+		behind, ahead = step(behind), step(ahead)
+		transient += 1
+
+	return transient
+
+
+def evolve(history, step, stats=None, progress=None, first_block=16):
+	"""
+	fill generations 1.. of history (see history.py) from generation 0 with step(prev, out=row),
+	stopping early on a cycle.
+
+	returns (transient, period, counts): the transient length and period of the orbit
+	(both None if no repeat was seen before the end of the history) and the number of 1s
+	in every generation. each new row is counted in full with np.count_nonzero right
+	after it is stepped: updating the count from the cells that changed would need a
+	comparison pass over the same row, which measures slower than the count itself.
+	stats is an optional instrument.RunStats. progress(filled), if given, is called with
+	the number of generations filled so far as the history grows, see iter_evolve.
+	"""
+	run = iter_evolve(history, step, stats, first_block if progress else history.generations)
+	try:
+		while True:
+			filled = next(run)
+			if progress:
+				progress(filled)
+	except StopIteration as done:
+		return done.value
+
+
+def iter_evolve(history, step, stats=None, first_block=16):
+	"""
+	evolve as a generator, for drawing a history while it is computed: yields the number
+	of generations filled so far after the first first_block of them, then after blocks
+	that double in size (so redrawing everything each time costs about twice one final
+	draw), and a last time once the whole history is filled. returns what evolve returns.
+	"""
+	stats = stats or NO_STATS
+	stats.start()
+	try:
+		generations = history.generations
+		next_yield = first_block
+		counts = np.zeros(generations, dtype=np.int64)
+
+		x0 = np.array(history[0], dtype=np.uint8)
+		counts[0] = np.count_nonzero(x0)
+
+		detector = CycleDetector(x0)
+		prev, cur = x0.copy(), np.empty_like(x0)
+
+		for gen in range(1, generations):
+			step(prev, out=cur)
+			stats.lap("step")
+			history[gen] = cur
+			stats.lap("history")
+			counts[gen] = np.count_nonzero(cur)
+			stats.lap("density")
+
+			# fixed points are checked directly, longer cycles through the detector
+			if counts[gen] == counts[gen - 1] and np.array_equal(cur, prev):
+				period = 1
+			else:
+				period = detector.push(cur)
+			stats.lap("cycle check")
+			stats.end_step(len(cur))
+
+			if not period and next_yield <= gen + 1 < generations:
+				yield gen + 1
+				next_yield = 2 * (gen + 1)
+				# time spent by the caller between blocks is not stepping time
+				stats.lap("streaming")
+
+			if period:
+				transient = transient_length(history, gen, period, x0, step)
+
+				# generations gen+1 .. gen+period are the last period ones over again
+				if history.has(gen + 1 - period):
+					cycle = history.rows(gen + 1 - period, gen + 1).copy()
+				else:
+					cycle = np.empty((period, len(cur)), dtype=np.uint8)
+					cycle[-1] = cur
+					for i in range(period - 1):
+						step(cycle[i - 1], out=cycle[i])
+
+				# everything after this repeats the cycle, so copy it instead of stepping it
+				history.fill_periodic(gen + 1, cycle)
+				rest = np.arange(gen + 1, generations)
+				counts[rest] = counts[gen + 1 - period + (rest - gen - 1) % period]
+
+				stats.finish(transient, transient, period)
+				yield generations
+				return transient, period, counts
+
+			prev, cur = cur, prev
+
+		stats.finish()
+		yield generations
+		return None, None, counts
+	finally:
+		# also when the run is left early: an exception, or the generator closed half-way
+		stats.release()
@@ -0,0 +1,184 @@
+"""
+batched engines: evolve a whole set of initialization vectors at once.
+
+the IVs are the rows of an (n_ivs, length) array and every generation steps all
+of the still active rows together along axis 1. rows that have become homogeneous
+are dropped from the active set, so converged lattices cost nothing afterwards.
+"""
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from kernels import gkl_step, window_index
+from backend import get_backend
+from instrument import NO_STATS
+
+
+def run_ensemble(ivs, j=1, k=3, limit=600, stats=None):
+	"""
+	run the (j, k) GKL rule on every row of ivs until it is homogeneous or limit steps have passed.
+
+	returns (densities, steps): the final density of 1s in each row and the number of
+	steps each row took to converge. rows that did not converge have steps == limit and
+	a density strictly between 0 and 1. stats is an optional instrument.RunStats.
+	with the numba backend (see backend.py) every IV runs in one fused compiled loop,
+	and stats records the whole run as a single step.
+	"""
+	stats = stats or NO_STATS
+	stats.start()
+	try:
+		cells = np.array(ivs, dtype=np.uint8, ndmin=2)
+		n_ivs, length = cells.shape
+
+		fused = get_backend().gkl_ensemble
+		if fused is not None:
+			densities, steps = fused(cells, j, k, limit)
+			stats.lap("fused step")
+			stats.end_step(int(steps.sum()) * length)
+			stats.finish(steps)
+			return densities, steps
+
+		counts = cells.sum(axis=1, dtype=np.int64)
+		steps = np.zeros(n_ivs, dtype=np.int64)
+
+		active = np.flatnonzero((counts > 0) & (counts < length))
+		live = cells[active]
+
+		for _ in range(limit):
+			if not len(active):
+				break
+
+			live = gkl_step(live, j, k)
+			stats.lap("step")
+			live_counts = live.sum(axis=1, dtype=np.int64)
+			steps[active] += 1
+			stats.lap("density")
+			updated = live.size
+
+			done = (live_counts == 0) | (live_counts == length)
+			if done.any():
+				# write the converged rows back and drop them from the active set
+				counts[active[done]] = live_counts[done]
+				keep = ~done
+				active, live, live_counts = active[keep], live[keep], live_counts[keep]
+			stats.lap("compaction")
+			stats.end_step(updated)
+
+		counts[active] = live.sum(axis=1, dtype=np.int64)
+		stats.finish(steps)
+
+		return counts / length, steps
+	finally:
+		stats.release()
+
+
+def run_population(ivs, tables, radius, limit=600, stats=None):
+	"""
+	run every rule in tables (lookup tables of the given radius, one per row, see
+	kernels.make_table) on every row of ivs, like run_ensemble.
+
+	all (rule, IV) pairs are stepped together: the window index of every active row is
+	offset by its rule's position in the stacked tables and looked up in one gather.
+	returns (densities, steps), both of shape (len(tables), len(ivs)).
+	"""
+	stats = stats or NO_STATS
+	stats.start()
+	try:
+		cells = np.array(ivs, dtype=np.uint8, ndmin=2)
+		tables = np.array(tables, dtype=np.uint8, ndmin=2)
+		n_ivs, length = cells.shape
+		n_rules, size = tables.shape
+		flat = tables.ravel()
+
+		counts = np.tile(cells.sum(axis=1, dtype=np.int64), n_rules)
+		steps = np.zeros(n_rules * n_ivs, dtype=np.int64)
+
+		# row p * n_ivs + b is IV b under rule p
+		active = np.flatnonzero((counts > 0) & (counts < length))
+		live = cells[active % n_ivs]
+		offsets = (size * (active // n_ivs)).astype(np.int32)[:, None]
+
+		for _ in range(limit):
+			if not len(active):
+				break
+
+			live = np.take(flat, window_index(live, radius) + offsets)
+			stats.lap("step")
+			live_counts = live.sum(axis=1, dtype=np.int64)
+			steps[active] += 1
+			stats.lap("density")
+			updated = live.size
+
+			done = (live_counts == 0) | (live_counts == length)
+			if done.any():
+				counts[active[done]] = live_counts[done]
+				keep = ~done
+				active, live, offsets = active[keep], live[keep], offsets[keep]
+			stats.lap("compaction")
+			stats.end_step(updated)
+
+		counts[active] = live.sum(axis=1, dtype=np.int64)
+		stats.finish(steps)
+
+		return (counts / length).reshape(n_rules, n_ivs), steps.reshape(n_rules, n_ivs)
+	finally:
+		stats.release()
+
+
+def run_gkl_population(ivs, params, limit=600, stats=None):
+	"""
+	run every (j, k) neighbourhood in params on every row of ivs, like run_population
+	does for tables. returns (densities, steps), both of shape (len(params), len(ivs)).
+
+	all (neighbourhood, IV) pairs step together: the active rows are padded by wrapping
+	max(j, k) cells around each end, and every row picks its four neighbour rows out of
+	the sliding windows of the padded array with one gather of whole rows each.
+	"""
+	stats = stats or NO_STATS
+	stats.start()
+	try:
+		cells = np.array(ivs, dtype=np.uint8, ndmin=2)
+		n_ivs, length = cells.shape
+		# shifts wrap around the ring, as np.roll does for run_ensemble
+		params = np.array(params, dtype=np.int64).reshape(-1, 2) % length
+		n_params = len(params)
+		reach = int(params.max())
+
+		counts = np.tile(cells.sum(axis=1, dtype=np.int64), n_params)
+		steps = np.zeros(n_params * n_ivs, dtype=np.int64)
+
+		# row p * n_ivs + b is IV b under neighbourhood p
+		active = np.flatnonzero((counts > 0) & (counts < length))
+		live = cells[active % n_ivs]
+		j, k = params[active // n_ivs].T
+
+		for _ in range(limit):
+			if not len(active):
+				break
+
+			# window reach + s of the padded rows is the row shifted s places to the left
+			padded = np.concatenate([live[:, length - reach :], live, live[:, :reach]], axis=1)
+			windows = sliding_window_view(padded, length, axis=1)
+			rows = np.arange(len(live))
+			right = windows[rows, reach + j] & windows[rows, reach + k]
+			left = windows[rows, reach - j] | windows[rows, reach - k]
+			live = (live & left) | ((live ^ 1) & right)
+			stats.lap("step")
+			live_counts = live.sum(axis=1, dtype=np.int64)
+			steps[active] += 1
+			stats.lap("density")
+			updated = live.size
+
+			done = (live_counts == 0) | (live_counts == length)
+			if done.any():
+				counts[active[done]] = live_counts[done]
+				keep = ~done
+				active, live, j, k = active[keep], live[keep], j[keep], k[keep]
+			stats.lap("compaction")
+			stats.end_step(updated)
+
+		counts[active] = live.sum(axis=1, dtype=np.int64)
+		stats.finish(steps)
+
+		return (counts / length).reshape(n_params, n_ivs), steps.reshape(n_params, n_ivs)
+	finally:
+		stats.release()
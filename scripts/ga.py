@@ -0,0 +1,192 @@
+"""
+genetic search for density-classification rules, in the spirit of the EvCA experiments
+of Mitchell, Crutchfield and Das.
+
+two kinds of genome are evolved:
+
+	tables  radius-3 lookup tables (128 bits, see kernels.make_table), starting from
+	        tables whose fraction of 1s is uniform in [0, 1]
+	jk      (j, k) neighbourhoods of the GKL rule, 1 <= j, k <= max_radius
+
+every generation draws a fresh batch of IVs with densities uniform in [0, 1] and scores
+each rule by the fraction of the batch it drives to the homogeneous majority state
+within limit steps. all rules of a worker's share of the population are run on the
+batch together, in one batched pass (ensemble.run_population for tables,
+run_gkl_population for (j, k)); the population is split over a pool of worker
+processes. the elite survive, the rest of the population is bred from them by
+one-point crossover and mutation.
+
+the state after every generation (population, scores so far and the random generator)
+is written to the checkpoint file, and a search can be resumed from it:
+
+	python ga.py tables --population 100 --generations 50 --checkpoint run.npz
+	python ga.py tables --generations 100 --checkpoint run.npz --resume
+"""
+import argparse
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from ensemble import run_gkl_population, run_population
+from ivgen import exact_density_ivs
+from numba_kernels import limit_threads
+
+RADIUS = 3
+TABLE_SIZE = 1 << (2 * RADIUS + 1)
+
+
+def random_ivs(count, length, rng):
+	"""count IVs of length cells with densities drawn uniformly from [0, 1]."""
+	return exact_density_ivs(rng.uniform(0, 1, count), length, rng)
+
+
+def _score(densities, ivs):
+	# fraction of IVs each rule settled on the all-majority row (lengths are odd, so no ties)
+	majority = (2 * ivs.sum(axis=1) > ivs.shape[1]).astype(np.float64)
+
+	return (densities == majority).mean(axis=1)
+
+
+def _evaluate_chunk(mode, genomes, ivs, limit):
+	if mode == "tables":
+		densities, _ = run_population(ivs, genomes, RADIUS, limit)
+	else:
+		densities, _ = run_gkl_population(ivs, genomes, limit)
+
+	return _score(densities, ivs)
+
+
+def evaluate(mode, genomes, ivs, limit, workers=1):
+	"""fitness of every genome on the IV batch, spread over workers processes."""
+	if workers == 1 or len(genomes) < 2:
+		return _evaluate_chunk(mode, genomes, ivs, limit)
+
+	chunks = np.array_split(genomes, min(workers, len(genomes)))
+	with ProcessPoolExecutor(max_workers=workers, initializer=limit_threads) as pool:
+		futures = [pool.submit(_evaluate_chunk, mode, chunk, ivs, limit) for chunk in chunks]
+
+		return np.concatenate([future.result() for future in futures])
+
+
+def initial_population(mode, size, rng, max_radius=10):
+	if mode == "tables":
+		# uniform over the fraction of 1s, not over tables (which would all sit near 1/2)
+		fraction = rng.uniform(0, 1, (size, 1))
+		return (rng.uniform(0, 1, (size, TABLE_SIZE)) < fraction).astype(np.uint8)
+
+	return rng.integers(1, max_radius + 1, (size, 2))
+
+
+def breed(mode, elite, count, rng, mutations=2, max_radius=10):
+	"""count children of random pairs of the elite, by one-point crossover and mutation."""
+	parents = elite[rng.integers(0, len(elite), (count, 2))]
+	cut = rng.integers(1, elite.shape[1], count)[:, None]
+	children = np.where(np.arange(elite.shape[1]) < cut, parents[:, 0], parents[:, 1])
+
+	if mode == "tables":
+		# flip mutations bits of every child (possibly the same bit twice)
+		for _ in range(mutations):
+			children[np.arange(count), rng.integers(0, TABLE_SIZE, count)] ^= 1
+	else:
+		# move j or k by one place
+		which = rng.integers(0, 2, count)
+		children[np.arange(count), which] += rng.choice((-1, 1), count)
+		children = np.clip(children, 1, max_radius)
+
+	return children
+
+
+def save_checkpoint(path, state):
+	# written next to the target and renamed over it, so a crash never leaves half a file
+	tmp = path + ".tmp.npz"
+	np.savez(tmp, population=state["population"], history=np.array(state["history"]).reshape(-1, 3), best=state["best"], config=json.dumps(state["config"]), rng=json.dumps(state["rng"].bit_generator.state))
+	os.replace(tmp, path)
+
+
+def load_checkpoint(path):
+	with np.load(path) as f:
+		rng = np.random.default_rng()
+		rng.bit_generator.state = json.loads(str(f["rng"]))
+
+		return {
+			"population": f["population"],
+			"history": [(int(gen), float(best), float(mean)) for gen, best, mean in f["history"]],
+			"best": f["best"],
+			"config": json.loads(str(f["config"])),
+			"rng": rng,
+		}
+
+
+def search(mode="tables", population=100, generations=50, elite=20, n_ivs=100, length=149, limit=None, mutations=2, max_radius=10, workers=None, seed=None, checkpoint=None, resume=False, report=None):
+	"""
+	run the genetic search and return its state: the final population, history (one
+	(generation, best, mean) fitness triple per generation), the best genome seen and the
+	config. with resume the search carries on from checkpoint up to generations, with the
+	config it was started with. report, if given, is called with every history entry.
+	"""
+	if resume:
+		state = load_checkpoint(checkpoint)
+		state["config"]["generations"] = generations
+	else:
+		config = dict(mode=mode, population=population, elite=elite, n_ivs=n_ivs, length=length, limit=limit or 2 * length, mutations=mutations, max_radius=max_radius, generations=generations)
+		rng = np.random.default_rng(seed)
+		state = {"population": initial_population(mode, population, rng, max_radius), "history": [], "best": None, "config": config, "rng": rng}
+
+	c, rng = state["config"], state["rng"]
+	workers = workers or os.cpu_count() or 1
+
+	for gen in range(len(state["history"]), c["generations"]):
+		ivs = random_ivs(c["n_ivs"], c["length"], rng)
+		fitness = evaluate(c["mode"], state["population"], ivs, c["limit"], workers)
+
+		order = np.argsort(-fitness, kind="stable")
+		ranked = state["population"][order]
+		if not state["history"] or fitness[order[0]] >= max(h[1] for h in state["history"]):
+			state["best"] = ranked[0].copy()
+		state["history"].append((gen, float(fitness[order[0]]), float(fitness.mean())))
+		if report:
+			report(state["history"][-1])
+
+		survivors = ranked[: c["elite"]]
+		children = breed(c["mode"], survivors, c["population"] - len(survivors), rng, c["mutations"], c["max_radius"])
+		state["population"] = np.concatenate([survivors, children])
+
+		if checkpoint:
+			save_checkpoint(checkpoint, state)
+
+	return state
+
+
+def main():
+	parser = argparse.ArgumentParser(description="evolve density-classification rules")
+	parser.add_argument("mode", choices=("tables", "jk"), help="radius-3 tables or (j, k) GKL neighbourhoods")
+	parser.add_argument("--population", type=int, default=100)
+	parser.add_argument("--generations", type=int, default=50, help="total generations (including those in a resumed checkpoint)")
+	parser.add_argument("--elite", type=int, default=20)
+	parser.add_argument("--ivs", type=int, default=100, help="IVs per generation")
+	parser.add_argument("--length", type=int, default=149, help="cells per IV (odd)")
+	parser.add_argument("--limit", type=int, help="steps per run (2 * length by default)")
+	parser.add_argument("--mutations", type=int, default=2, help="bits flipped per child table")
+	parser.add_argument("--max-radius", type=int, default=10, help="largest j or k")
+	parser.add_argument("--workers", type=int, help="processes (all cores by default)")
+	parser.add_argument("--seed", type=int)
+	parser.add_argument("--checkpoint", help="npz file written after every generation")
+	parser.add_argument("--resume", action="store_true", help="carry on from --checkpoint")
+	args = parser.parse_args()
+
+	if args.resume and not args.checkpoint:
+		parser.error("--resume needs --checkpoint")
+
+	state = search(args.mode, args.population, args.generations, args.elite, args.ivs, args.length, args.limit, args.mutations, args.max_radius, args.workers, args.seed, args.checkpoint, args.resume, report=lambda h: print(f"generation {h[0]}: best {h[1]:.3f}, mean {h[2]:.3f}", flush=True))
+
+	best = state["best"]
+	if state["config"]["mode"] == "tables":
+		print("best table:", "".join(map(str, best)))
+	else:
+		print(f"best (j, k): ({best[0]}, {best[1]})")
+
+
+if __name__ == "__main__":
+	main()
@@ -1,22 +1,7 @@
-import random
+from ivgen import write_ivs
 
-f = open('initialization_vectors_289.txt', 'w')
+# 1000 densities close to 0.5, 1000 vectors of 289 cells each, with their exact density
+# and majority element, written to a binary IV store (see ivstore.py)
+write_ivs('initialization_vectors_289.ivs', 1000 * 1000, 289, density_range=(0.45, 0.55), per_density=1000)
 
-for _ in range(1000):
-	
-	i = random.uniform(0.45, 0.55)  # generate a random density close to 0.5
-	majority = 1 if i>0.5 else 0  # find majority element
-
-	n = 289  # number of cells
-	freq = (int)(i*n)
-	arr = [1]*freq
-	arr2 = [0]*(n-freq)
-	arr += arr2
-
-	vectors = []
-
-	for _ in range(1000):
-	  random.shuffle(arr)
-	  f.write(str(arr) + ', ' + str(i) + ', '+ str(majority) + '\n')
-
-print('Done')
\ No newline at end of file
+print('Done')
@@ -0,0 +1,154 @@
+"""
+storage for the space-time history of a run.
+
+all modes keep cells as uint8 0/1 (or bit-packed, 8 cells per byte, with packed=True)
+and share one interface: history[gen] = row to record a generation, history.rows(start, stop)
+to read generations back as an (n, length) uint8 array, and np.asarray(history) for
+everything that is still held, which is what the plotting code uses.
+
+	DenseHistory   every generation, in memory
+	RingHistory    only the last keep generations, in memory
+	MemmapHistory  every generation, in a np.memmap on disk
+"""
+import os
+import tempfile
+
+import numpy as np
+
+# rows written per block when a cycle is copied into the rest of a history
+_BLOCK = 4096
+
+
+class History:
+
+	def __init__(self, generations, length, packed=False):
+		self.generations = generations
+		self.length = length
+		self.packed = packed
+		self.width = -(-length // 8) if packed else length
+
+	@property
+	def shape(self):
+		return (self.generations, self.length)
+
+	def _encode(self, rows):
+		rows = np.asarray(rows, dtype=np.uint8)
+		return np.packbits(rows, axis=-1, bitorder="little") if self.packed else rows
+
+	def _decode(self, data):
+		if self.packed:
+			return np.unpackbits(data, axis=-1, count=self.length, bitorder="little")
+		return np.asarray(data)
+
+	def first(self):
+		"""earliest generation that can still be read back."""
+		return 0
+
+	def has(self, gen):
+		return self.first() <= gen < self.generations
+
+	def __setitem__(self, gen, row):
+		self.write(gen, np.asarray(row)[None, :])
+
+	def __getitem__(self, gen):
+		return self.rows(gen, gen + 1)[0]
+
+	def fill_periodic(self, start, cycle):
+		"""write generations start.. to the end as repeats of cycle (cycle[0] goes to start)."""
+		period = len(cycle)
+		begin = max(start, self._fill_from())
+
+		for block in range(begin, self.generations, _BLOCK):
+			stop = min(block + _BLOCK, self.generations)
+			self.write(block, cycle[(np.arange(block, stop) - start) % period])
+
+	def _fill_from(self):
+		return 0
+
+	def __array__(self, dtype=None, copy=None):
+		data = self.rows(self.first(), self.generations)
+		return data if dtype is None else data.astype(dtype)
+
+
+class DenseHistory(History):
+	"""every generation in one (generations, length) uint8 buffer, or (generations, length / 8) packed."""
+
+	def __init__(self, generations, length, packed=False):
+		super().__init__(generations, length, packed)
+		self.data = np.zeros((generations, self.width), dtype=np.uint8)
+
+	def write(self, start, rows):
+		self.data[start : start + len(rows)] = self._encode(rows)
+
+	def rows(self, start, stop):
+		return self._decode(self.data[start:stop])
+
+
+class MemmapHistory(DenseHistory):
+	"""
+	every generation in a np.memmap, for runs longer than memory.
+	without a path the file goes to a temporary directory and is removed with the object.
+	"""
+
+	def __init__(self, generations, length, packed=False, path=None):
+		History.__init__(self, generations, length, packed)
+
+		self._tmp = None
+		if path is None:
+			self._tmp = tempfile.mkdtemp(prefix="ca_history_")
+			path = os.path.join(self._tmp, "history.dat")
+
+		self.path = path
+		self.data = np.memmap(path, np.uint8, "w+", shape=(generations, self.width))
+
+	def __del__(self):
+		if getattr(self, "_tmp", None):
+			del self.data
+			try:
+				os.remove(self.path)
+				os.rmdir(self._tmp)
+			except OSError:
+				pass
+
+
+class RingHistory(History):
+	"""only the last keep generations, in a ring buffer of keep rows."""
+
+	def __init__(self, generations, length, keep, packed=False):
+		super().__init__(generations, length, packed)
+		self.keep = min(keep, generations)
+		self.data = np.zeros((self.keep, self.width), dtype=np.uint8)
+		self.latest = -1
+
+	def first(self):
+		return max(0, self.latest - self.keep + 1)
+
+	def _fill_from(self):
+		# only the generations that will still be held at the end are worth writing
+		return self.generations - self.keep
+
+	def write(self, start, rows):
+		stop = start + len(rows)
+		if stop - self.keep > start:
+			rows, start = rows[stop - self.keep - start :], stop - self.keep
+
+		self.data[np.arange(start, stop) % self.keep] = self._encode(rows)
+		self.latest = max(self.latest, stop - 1)
+
+	def rows(self, start, stop):
+		if start < self.first() or stop > self.latest + 1:
+			raise IndexError(f"generations {start}:{stop} are not held (have {self.first()}:{self.latest + 1})")
+
+		return self._decode(self.data[np.arange(start, stop) % self.keep])
+
+
+def make_history(mode, generations, length, packed=False, keep=None, path=None):
+	"""history of the given mode: "dense", "ring" (needs keep) or "memmap" (optional path)."""
+	if mode == "dense":
+		return DenseHistory(generations, length, packed)
+	if mode == "ring":
+		return RingHistory(generations, length, keep, packed)
+	if mode == "memmap":
+		return MemmapHistory(generations, length, packed, path)
+
+	raise ValueError(f"unknown history mode {mode!r}, choose from 'dense', 'ring' or 'memmap'")
@@ -0,0 +1,189 @@
+"""
+optional instrumentation for the run loops.
+
+pass a RunStats to dynamics.evolve, ensemble.run_ensemble or sweep.run_sweep (and through
+them to the run_automaton methods and trial runners) to record
+
+	per-step wall time and cells updated per second
+	the time split between the phases of a step (stepping, density, history writes, ...)
+	generations until convergence (or the transient and period of a cycle)
+	peak traced memory and net allocated blocks, with trace_memory=True
+
+the loops call lap(phase) after each phase and end_step(cells) after each generation,
+and release() when they are left (even by an exception). without a RunStats they talk
+to NO_STATS, whose methods do nothing.
+
+tracemalloc traces the whole process, so runs with trace_memory take turns: one holds
+_trace_lock from start() until it is released, and tracing is switched off again
+afterwards unless something else had switched it on. the memory figures still cover
+every thread of the process (other sessions of the webapp included) while the run lasts.
+"""
+import threading
+import time
+import tracemalloc
+
+import numpy as np
+
+_trace_lock = threading.RLock()
+
+
+class RunStats:
+
+	def __init__(self, trace_memory=False, callback=None):
+		"""callback(stats), if given, is called after every step."""
+		self.trace_memory = trace_memory
+		self.callback = callback
+
+		self.phases = {}
+		self.step_times = []
+		self.cells = 0
+		self.convergence = []
+		self.transient = None
+		self.period = None
+		self.peak_bytes = None
+		self.net_blocks = None
+		self.wall = 0.0
+
+		self._snapshot = None
+		self._tracing = None # None, or whether this run switched tracemalloc on
+		self._started = None
+		self._last = None
+		self._step_start = None
+
+	def start(self):
+		if self.trace_memory and self._tracing is None:
+			_trace_lock.acquire()
+			self._tracing = not tracemalloc.is_tracing()
+			if self._tracing:
+				tracemalloc.start()
+			tracemalloc.reset_peak()
+			self._snapshot = tracemalloc.take_snapshot()
+
+		self._started = self._last = self._step_start = time.perf_counter()
+
+	def lap(self, phase):
+		"""charge the time since the last lap to phase."""
+		now = time.perf_counter()
+		self.phases[phase] = self.phases.get(phase, 0.0) + now - self._last
+		self._last = now
+
+	def end_step(self, cells):
+		"""close a step that updated cells cells."""
+		now = time.perf_counter()
+		self.step_times.append(now - self._step_start)
+		self.cells += cells
+		self._step_start = self._last = now
+
+		if self.callback:
+			self.callback(self)
+
+	def finish(self, convergence=None, transient=None, period=None):
+		"""
+		close the run. convergence is the number of generations until convergence,
+		one per lattice (an array for ensembles).
+		"""
+		self.wall += time.perf_counter() - self._started
+
+		if convergence is not None:
+			self.convergence.extend(np.atleast_1d(convergence).tolist())
+		self.transient, self.period = transient, period
+
+		if self.trace_memory and self._snapshot is not None:
+			_, self.peak_bytes = tracemalloc.get_traced_memory()
+			diff = tracemalloc.take_snapshot().compare_to(self._snapshot, "filename")
+			self.net_blocks = sum(stat.count_diff for stat in diff)
+		self.release()
+
+	def release(self):
+		"""stop tracing memory for this run (if it was) and let the next traced run start."""
+		if self._tracing is None:
+			return
+
+		self._snapshot = None
+		if self._tracing:
+			tracemalloc.stop()
+		self._tracing = None
+		_trace_lock.release()
+
+	def merge(self, other):
+		"""fold in the stats of another run (e.g. a work unit of a sweep)."""
+		for phase, seconds in other.phases.items():
+			self.phases[phase] = self.phases.get(phase, 0.0) + seconds
+		self.step_times.extend(other.step_times)
+		self.cells += other.cells
+		self.convergence.extend(other.convergence)
+		self.wall += other.wall
+
+		if other.peak_bytes is not None:
+			self.peak_bytes = max(self.peak_bytes or 0, other.peak_bytes)
+			self.net_blocks = (self.net_blocks or 0) + other.net_blocks
+
+	def __getstate__(self):
+		# the callback stays behind when stats travel back from a worker process
+		state = self.__dict__.copy()
+		state["callback"] = None
+		state["_snapshot"] = None
+		state["_tracing"] = None
+		return state
+
+	def summary(self):
+		steps = np.array(self.step_times)
+		stepping = sum(self.phases.values())
+
+		summary = {
+			"steps": len(steps),
+			"wall_seconds": self.wall,
+			"cells_per_sec": self.cells / stepping if stepping else 0.0,
+			"mean_step_ms": 1e3 * steps.mean() if len(steps) else 0.0,
+			"max_step_ms": 1e3 * steps.max() if len(steps) else 0.0,
+			"phase_share": {phase: seconds / stepping for phase, seconds in self.phases.items()} if stepping else {},
+		}
+
+		if self.convergence:
+			summary["mean_convergence"] = float(np.mean(self.convergence))
+			summary["max_convergence"] = int(np.max(self.convergence))
+		if self.period:
+			summary["transient"], summary["period"] = self.transient, self.period
+		if self.peak_bytes is not None:
+			summary["peak_mb"] = self.peak_bytes / 2**20
+			summary["net_blocks"] = self.net_blocks
+
+		return summary
+
+	def report(self):
+		"""the summary as lines of text, for the CLI and the diagnostics panels."""
+		s = self.summary()
+		lines = [
+			f"{s['steps']} steps in {s['wall_seconds']:.4f} s, {s['cells_per_sec']:.3g} cells/s",
+			f"step time: mean {s['mean_step_ms']:.3f} ms, max {s['max_step_ms']:.3f} ms",
+			"time split: " + ", ".join(f"{phase} {100 * share:.1f}%" for phase, share in s["phase_share"].items()),
+		]
+		if "mean_convergence" in s:
+			lines.append(f"generations until convergence: mean {s['mean_convergence']:.1f}, max {s['max_convergence']}")
+		if "period" in s:
+			lines.append(f"cycle of period {s['period']} after a transient of {s['transient']}")
+		if "peak_mb" in s:
+			lines.append(f"peak traced memory {s['peak_mb']:.2f} MB, {s['net_blocks']} net allocated blocks (whole process)")
+
+		return "\n".join(lines)
+
+
+class _NoStats:
+
+	def start(self):
+		pass
+
+	def lap(self, phase):
+		pass
+
+	def end_step(self, cells):
+		pass
+
+	def finish(self, convergence=None, transient=None, period=None):
+		pass
+
+	def release(self):
+		pass
+
+
+NO_STATS = _NoStats()
@@ -0,0 +1,56 @@
+"""
+vectorized generation of exact-density initialization vectors.
+
+a row with density d has exactly int(d * length) ones; whole chunks of rows are
+built at once and shuffled row by row with Generator.permuted, so nothing runs
+per cell or per vector in python.
+"""
+import numpy as np
+
+from ivstore import IVWriter
+
+
+def exact_density_ivs(densities, length, rng=None):
+	"""
+	one row per entry of densities, with exactly int(density * length) ones placed at random.
+	rng is a numpy Generator or a seed.
+	"""
+	rng = np.random.default_rng(rng)
+	K = (np.asarray(densities, dtype=np.float64).reshape(-1) * length).astype(np.int64)
+
+	rows = (np.arange(length) < K[:, None]).astype(np.uint8)
+
+	return rng.permuted(rows, axis=1, out=rows)
+
+
+def generate_ivs(count, length, density_range=(0.45, 0.55), seed=None, chunk_size=10000, per_density=1):
+	"""
+	yield (cells, densities, majority) chunks of at most chunk_size rows until count rows are made.
+
+	densities are drawn uniformly from density_range, each one shared by per_density consecutive
+	rows. the density and majority reported for a row are the exact ones of its cells.
+	"""
+	rng = np.random.default_rng(seed)
+	low, high = density_range
+	drawn = np.zeros(0)
+
+	for start in range(0, count, chunk_size):
+		n = min(chunk_size, count - start)
+
+		# one density per group of per_density rows; a group cut by the chunk boundary keeps its density
+		first, last = start // per_density, (start + n - 1) // per_density
+		carried = drawn[-1:] if len(drawn) and (start - 1) // per_density == first else np.zeros(0)
+		drawn = np.concatenate([carried, rng.uniform(low, high, last - first + 1 - len(carried))])
+		group = np.arange(start, start + n) // per_density - first
+
+		cells = exact_density_ivs(drawn[group], length, rng)
+		ones = cells.sum(axis=1, dtype=np.int64)
+
+		yield cells, ones / length, (2 * ones > length).astype(np.uint8)
+
+
+def write_ivs(path, count, length, density_range=(0.45, 0.55), seed=None, chunk_size=10000, per_density=1):
+	"""generate count IVs straight into an IV store at path, one chunk at a time."""
+	with IVWriter(path, length) as writer:
+		for cells, densities, majority in generate_ivs(count, length, density_range, seed, chunk_size, per_density):
+			writer.append(cells, densities, majority)
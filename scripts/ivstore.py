@@ -0,0 +1,175 @@
+"""
+compact binary store for initialization vectors.
+
+layout (little endian):
+	header   32 bytes: magic b"CAIV", version (u2), reserved (u2), length (u4), count (u8), padding
+	rows     count x ceil(length / 8) bytes, each row bit-packed with np.packbits(bitorder="little")
+	density  count x f8, the density each row was generated with
+	majority count x u1, the majority element of each row
+
+a 289-cell vector takes 37 + 9 bytes instead of the ~900 characters of the text format.
+the reader memory-maps the file, so opening it costs nothing and batches of packed
+rows are views into the map.
+
+    python ivstore.py initialization_vectors_289.txt initialization_vectors_289.ivs
+
+converts a file written by the old text format.
+"""
+import struct
+import sys
+
+import numpy as np
+
+MAGIC = b"CAIV"
+VERSION = 1
+HEADER = struct.Struct("<4sHHIQ")
+HEADER_SIZE = 32
+
+
+def row_bytes(length):
+	return -(-length // 8)
+
+
+class IVWriter:
+	"""
+	streams IVs into a store. rows go straight to disk, the density and majority columns
+	are kept in memory (9 bytes per IV) and written after the rows on close.
+	"""
+
+	def __init__(self, path, length):
+		self.path = path
+		self.length = length
+		self.count = 0
+		self.densities = []
+		self.majority = []
+
+		self.f = open(path, "wb")
+		self.f.write(b"\0" * HEADER_SIZE) # filled in on close
+
+	def append(self, cells, densities, majority):
+		"""add a chunk: cells is (n, length) of 0/1, densities and majority have n entries."""
+		cells = np.asarray(cells, dtype=np.uint8).reshape(-1, self.length)
+
+		self.f.write(np.packbits(cells, axis=1, bitorder="little").tobytes())
+		self.densities.append(np.asarray(densities, dtype="<f8").reshape(-1))
+		self.majority.append(np.asarray(majority, dtype=np.uint8).reshape(-1))
+		self.count += len(cells)
+
+	def close(self):
+		for column in (self.densities, self.majority):
+			if column:
+				self.f.write(np.concatenate(column).tobytes())
+
+		self.f.seek(0)
+		self.f.write(HEADER.pack(MAGIC, VERSION, 0, self.length, self.count))
+		self.f.close()
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *exc):
+		self.close()
+
+
+class IVStore:
+	"""memory-mapped reader for a store written by IVWriter."""
+
+	def __init__(self, path):
+		self.path = path
+
+		with open(path, "rb") as f:
+			magic, version, _, self.length, self.count = HEADER.unpack(f.read(HEADER.size))
+		if magic != MAGIC or version != VERSION:
+			raise ValueError(f"{path} is not an IV store (version {VERSION})")
+		self.shape = (self.count, self.length)
+
+		width = row_bytes(self.length)
+		offset = HEADER_SIZE
+		self.packed = np.memmap(path, np.uint8, "r", offset, (self.count, width)) if self.count else np.zeros((0, width), np.uint8)
+
+		offset += self.count * width
+		self.densities = np.memmap(path, "<f8", "r", offset, (self.count,)) if self.count else np.zeros(0)
+
+		offset += self.count * 8
+		self.majority = np.memmap(path, np.uint8, "r", offset, (self.count,)) if self.count else np.zeros(0, np.uint8)
+
+	def __len__(self):
+		return self.count
+
+	def rows(self, start=0, stop=None):
+		"""rows start:stop unpacked to an (n, length) uint8 array of cells."""
+		return np.unpackbits(self.packed[start:stop], axis=1, count=self.length, bitorder="little")
+
+	def batches(self, batch_size=10000, packed=False):
+		"""
+		yield (cells, densities, majority) for consecutive batches of rows.
+		with packed=True the cells are the bit-packed rows themselves, as views into the map.
+		"""
+		for start in range(0, self.count, batch_size):
+			stop = min(start + batch_size, self.count)
+			cells = self.packed[start:stop] if packed else self.rows(start, stop)
+
+			yield cells, self.densities[start:stop], self.majority[start:stop]
+
+
+def is_store(path):
+	with open(path, "rb") as f:
+		return f.read(len(MAGIC)) == MAGIC
+
+
+def parse_text_line(line):
+	# "[c0, c1, ...], density, majority", as written by the old generate_iv.py
+	arr, density, maj_elmnt = line.rsplit(",", 2)
+
+	return [int(c) for c in arr.strip()[1:-1].split(",")], float(density), int(maj_elmnt)
+
+
+def load_ivs(path):
+	"""(cells, densities, majority) of every IV in a store or an old-style text file."""
+	if is_store(path):
+		store = IVStore(path)
+		return store.rows(), np.array(store.densities), np.array(store.majority, dtype=np.int64)
+
+	cells, densities, majority = [], [], []
+	with open(path) as f:
+		for line in f:
+			if line.strip():
+				c, d, m = parse_text_line(line)
+				cells.append(c)
+				densities.append(d)
+				majority.append(m)
+
+	return np.array(cells, dtype=np.uint8), np.array(densities), np.array(majority, dtype=np.int64)
+
+
+def convert_text(src, dst, chunk=10000):
+	"""stream an old-style text IV file into a store."""
+	writer = None
+	cells, densities, majority = [], [], []
+
+	with open(src) as f:
+		for line in f:
+			if not line.strip():
+				continue
+
+			c, d, m = parse_text_line(line)
+			if writer is None:
+				writer = IVWriter(dst, len(c))
+			cells.append(c)
+			densities.append(d)
+			majority.append(m)
+
+			if len(cells) == chunk:
+				writer.append(cells, densities, majority)
+				cells, densities, majority = [], [], []
+
+	if writer is None:
+		raise ValueError(f"{src} contains no IVs")
+
+	if cells:
+		writer.append(cells, densities, majority)
+	writer.close()
+
+
+if __name__ == "__main__":
+	convert_text(sys.argv[1], sys.argv[2])
@@ -0,0 +1,320 @@
+"""
+background jobs for the webapp: simulations run in a bounded pool of worker processes
+instead of the streamlit script thread.
+
+every job belongs to a session. a session may have a few unfinished jobs at a time, and
+the free workers take queued jobs from the sessions in turn, so one user cannot starve
+the others. each job runs in its own process, so a job that is cancelled or outlives its
+timeout is simply terminated and its CPU is free at once. a job reports its progress
+(and, optionally, the partial result so far) back while it runs; its result is stored
+in memo.results under the job's key, where later runs with the same inputs find it.
+
+an unfinished job is shared by every session that asks for the same key, and is only
+cancelled once none of them still wants it.
+
+the job function is called as fn(*args, progress=report), where report(fraction,
+partial=None) may be called any number of times; it must be importable by the worker
+processes (a module-level function).
+
+	job = jobs.submit(session, eca_job, (rule, iv, gens), key=("eca", ...))
+	while not job.finished:
+		draw(job.progress, job.partial)
+	job.result
+"""
+import itertools
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from collections import deque
+from multiprocessing.connection import wait
+
+import memo
+
+log = logging.getLogger(__name__)
+
+QUEUED, RUNNING, DONE, FAILED, CANCELLED, TIMED_OUT = "queued", "running", "done", "failed", "cancelled", "timed out"
+
+_FINISHED = (DONE, FAILED, CANCELLED, TIMED_OUT)
+
+
+class QueueFull(RuntimeError):
+	"""raised by JobManager.submit when a session already has too many unfinished jobs."""
+
+
+class Job:
+
+	def __init__(self, job_id, session, fn, args, key, timeout):
+		self.id = job_id
+		self.session = session # the session whose queue it waits in
+		self.holders = {session} # every session still waiting for it
+		self.fn = fn
+		self.args = args
+		self.key = key
+		self.timeout = timeout
+
+		self.state = QUEUED
+		self.progress = 0.0
+		self.partial = None
+		self.result = None
+		self.error = None
+		self.submitted = time.monotonic()
+		self.started = None
+		self.ended = None
+
+		self._process = None
+		self._conn = None
+
+	@property
+	def finished(self):
+		return self.state in _FINISHED
+
+	def __repr__(self):
+		return f"Job({self.id}, {self.state}, {self.progress:.0%})"
+
+
+def _run_job(conn, fn, args):
+	# body of a worker process: run fn, sending progress and then the result (or error)
+	def report(fraction, partial=None):
+		conn.send(("progress", fraction, partial))
+
+	try:
+		conn.send(("done", fn(*args, progress=report)))
+	except Exception as e:
+		conn.send(("error", f"{type(e).__name__}: {e}"))
+	finally:
+		conn.close()
+
+
+class JobManager:
+
+	def __init__(self, workers=None, per_session=2, timeout=120.0, keep_finished=600.0, preload=(), cache=None):
+		"""
+		workers processes run at once (half the cores by default), each session may have
+		per_session unfinished jobs, and a running job is stopped after timeout seconds
+		unless submit says otherwise. finished jobs are forgotten keep_finished seconds
+		after they end. preload names modules the worker processes import once up front
+		(where the platform supports it). results go to cache (memo.results by default).
+		"""
+		self.workers = workers or max(1, (os.cpu_count() or 2) // 2)
+		self.per_session = per_session
+		self.timeout = timeout
+		self.keep_finished = keep_finished
+		self.cache = cache if cache is not None else memo.results
+
+		# workers are forked from a clean server process rather than from this (threaded) one
+		if "forkserver" in multiprocessing.get_all_start_methods():
+			self._context = multiprocessing.get_context("forkserver")
+			self._context.set_forkserver_preload(list(preload))
+		else:
+			self._context = multiprocessing.get_context("spawn")
+
+		self._jobs = {}
+		self._queues = {}
+		self._served = {}
+		self._running = []
+		self._slots = {}
+		self._ids = itertools.count(1)
+		self._lock = threading.Condition()
+		self._thread = None
+
+	def submit(self, session, fn, args=(), key=None, refresh=False, slot=None, timeout=None):
+		"""
+		queue fn(*args) for session and return its Job. a result already cached under key
+		comes back as a finished job (unless refresh), and an unfinished job for the same
+		key, from any session, is shared instead of started twice. a new job in the same
+		slot of a session lets go of the one before it.
+		"""
+		with self._lock:
+			if slot is not None:
+				previous = self._jobs.get(self._slots.get((session, slot)))
+				if previous is not None and previous.key != key:
+					self._release(previous, session)
+
+			if key is not None and not refresh:
+				for job in self._jobs.values():
+					if job.key == key and not job.finished:
+						if session not in job.holders and self._unfinished(session) >= self.per_session:
+							raise QueueFull(f"{self._unfinished(session)} runs of this session are still queued or running")
+						job.holders.add(session)
+						return self._assign(job, session, slot)
+
+				cached = self.cache.get(key)
+				if cached is not None:
+					job = Job(next(self._ids), session, fn, args, key, timeout)
+					job.state, job.progress, job.result = DONE, 1.0, cached
+					job.ended = time.monotonic()
+					self._jobs[job.id] = job
+					return self._assign(job, session, slot)
+
+			unfinished = self._unfinished(session)
+			if unfinished >= self.per_session:
+				raise QueueFull(f"{unfinished} runs of this session are still queued or running")
+
+			job = Job(next(self._ids), session, fn, args, key, timeout or self.timeout)
+			self._jobs[job.id] = job
+			self._queues.setdefault(session, deque()).append(job)
+
+			if self._thread is None:
+				self._thread = threading.Thread(target=self._dispatch, name="jobs", daemon=True)
+				self._thread.start()
+			self._lock.notify()
+
+			return self._assign(job, session, slot)
+
+	def _unfinished(self, session):
+		return sum(1 for job in self._jobs.values() if session in job.holders and not job.finished)
+
+	def _assign(self, job, session, slot):
+		if slot is not None:
+			self._slots[(session, slot)] = job.id
+
+		return job
+
+	def get(self, job_id):
+		"""the Job with this id, or None once it has been forgotten."""
+		with self._lock:
+			return self._jobs.get(job_id)
+
+	def cancel(self, job_id, session=None):
+		"""
+		let session stop waiting for the job, which is cancelled once no session waits
+		for it any more. without a session, the job is cancelled outright.
+		"""
+		with self._lock:
+			job = self._jobs.get(job_id)
+			if job is None:
+				return
+			if session is None:
+				self._cancel(job)
+			else:
+				self._release(job, session)
+
+	def _release(self, job, session):
+		job.holders.discard(session)
+		if not job.holders:
+			self._cancel(job)
+
+	def _cancel(self, job):
+		if job.state == QUEUED:
+			self._queues[job.session].remove(job)
+		elif job.state == RUNNING:
+			self._stop(job)
+		else:
+			return
+		self._end(job, CANCELLED)
+
+	def _stop(self, job):
+		job._process.terminate()
+		job._process.join()
+		job._conn.close()
+		self._running.remove(job)
+
+	def _end(self, job, state, error=None):
+		job.state, job.error, job.ended = state, error, time.monotonic()
+
+	def _start_next(self):
+		# the oldest queued job of the session whose last job started longest ago
+		while True:
+			waiting = [queue[0] for queue in self._queues.values() if queue]
+			if not waiting:
+				return False
+			job = min(waiting, key=lambda job: (self._served.get(job.session, 0.0), job.submitted))
+			self._queues[job.session].popleft()
+			self._served[job.session] = time.monotonic()
+
+			parent, child = self._context.Pipe(duplex=False)
+			try:
+				job._process = self._context.Process(target=_run_job, args=(child, job.fn, job.args), daemon=True)
+				job._process.start()
+			except Exception as e:
+				parent.close()
+				self._end(job, FAILED, f"could not start a worker: {e}")
+				continue
+			finally:
+				child.close()
+
+			job._conn = parent
+			job.state, job.started = RUNNING, time.monotonic()
+			self._running.append(job)
+			return True
+
+	def _receive(self, job):
+		try:
+			while job._conn.poll():
+				message = job._conn.recv()
+				if message[0] == "progress":
+					job.progress, job.partial = message[1], message[2]
+				elif message[0] == "done":
+					job.progress, job.partial, job.result = 1.0, None, message[1]
+					self._end(job, DONE)
+					if job.key is not None:
+						try:
+							self.cache.put(job.key, job.result)
+						except Exception:
+							log.exception("caching the result of %r", job)
+				else:
+					self._end(job, FAILED, message[1])
+		except (EOFError, OSError):
+			if not job.finished:
+				self._end(job, FAILED, "the worker process died")
+
+		if job.finished:
+			job._process.join()
+			job._conn.close()
+			self._running.remove(job)
+
+	def _dispatch(self):
+		# the one thread serving every session: it must outlive any single failure
+		while True:
+			try:
+				conns = self._tick()
+			except Exception:
+				log.exception("job dispatcher")
+				time.sleep(0.1)
+				continue
+
+			if conns:
+				# sleep until a worker has something to say (or the next timeout check).
+				# a job cancelled meanwhile has closed its connection, which wait rejects
+				try:
+					wait(conns, timeout=0.1)
+				except (OSError, ValueError):
+					pass
+
+	def _tick(self):
+		# one round of bookkeeping; returns the connections of the running jobs
+		with self._lock:
+			now = time.monotonic()
+			for job in list(self._running):
+				self._receive(job)
+				if not job.finished and now - job.started > job.timeout:
+					self._stop(job)
+					self._end(job, TIMED_OUT, f"stopped after {job.timeout:g} s")
+
+			while len(self._running) < self.workers and self._start_next():
+				pass
+
+			for job_id, job in list(self._jobs.items()):
+				if job.finished and now - job.ended > self.keep_finished:
+					del self._jobs[job_id]
+			# and the sessions left without jobs
+			sessions = set().union(*(job.holders | {job.session} for job in self._jobs.values()))
+			for table in (self._queues, self._served):
+				for session in [session for session in table if session not in sessions]:
+					del table[session]
+			for slot in [slot for slot, job_id in self._slots.items() if job_id not in self._jobs]:
+				del self._slots[slot]
+
+			if not self._running:
+				self._lock.wait(timeout=1.0)
+				return None
+
+			return [job._conn for job in self._running]
+
+	def shutdown(self):
+		"""cancel everything queued or running."""
+		with self._lock:
+			for job in list(self._jobs.values()):
+				self._cancel(job)
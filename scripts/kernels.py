@@ -0,0 +1,181 @@
+"""
+vectorized stepping kernels shared by the scripts and the webapp.
+
+every kernel works on a whole row at once: the neighbourhood of each cell
+is packed into an integer index and the next state is looked up in a
+table, so there are no per-cell python calls.
+"""
+from functools import lru_cache
+
+import numpy as np
+
+
+def rule_table(rule_num):
+	"""
+	uint8 lookup table for an elementary rule.
+	entry i is the next state of the neighbourhood whose index is i = 4*L + 2*C + R,
+	i.e. bit i of the wolfram rule number.
+	tables are built once per process and shared, so they are read-only.
+	"""
+	rule_num = int(rule_num)
+	if rule_num < 0 or rule_num > 255:
+		raise ValueError(f"elementary rule numbers lie in [0, 255], got {rule_num}")
+
+	return _rule_table(rule_num)
+
+
+@lru_cache(maxsize=None)
+def _rule_table(rule_num):
+	table = ((rule_num >> np.arange(8)) & 1).astype(np.uint8)
+	table.flags.writeable = False
+
+	return table
+
+
+def eca_index(row):
+	"""
+	neighbourhood index 4*L + 2*C + R of every cell of a periodic row (or of every row
+	along the last axis of a batch), as uint8, built with shifts and wrapping at the ends.
+	"""
+	row = np.asarray(row, dtype=np.uint8)
+
+	idx = row << 1
+	idx[..., 1:] |= row[..., :-1] << 2
+	idx[..., 0] |= row[..., -1] << 2
+	idx[..., :-1] |= row[..., 1:]
+	idx[..., -1] |= row[..., 0]
+
+	return idx
+
+
+def eca_step(row, table, out=None):
+	"""
+	one generation of an elementary CA on a periodic row of 0/1 cells.
+	row must be an integer array; the result is a new uint8 row (or out, if given).
+	a 2-D array is treated as a batch of independent rows along its last axis.
+	"""
+	idx = eca_index(row)
+
+	# indices are always in range, and "clip" lets take write straight into out without buffering
+	return np.take(table, idx, out=out, mode="clip")
+
+
+# largest radius handled by lookup tables (2^9 = 512 entries)
+MAX_RADIUS = 4
+
+
+def _check_radius(radius):
+	if not 1 <= radius <= MAX_RADIUS:
+		raise ValueError(f"lookup tables cover radii 1 - {MAX_RADIUS}, got {radius}")
+
+
+def compile_rule(fn, radius):
+	"""
+	lookup table of a rule given as a python function of the 2*radius + 1 cells of a
+	neighbourhood, leftmost first. fn is called once per neighbourhood.
+	"""
+	_check_radius(radius)
+	width = 2 * radius + 1
+	table = np.array([fn(tuple((i >> (width - 1 - m)) & 1 for m in range(width))) for i in range(1 << width)], dtype=np.uint8)
+	if table.max(initial=0) > 1:
+		raise ValueError("rule functions must return 0 or 1")
+	table.flags.writeable = False
+
+	return table
+
+
+def make_table(rule, radius=1):
+	"""
+	uint8 lookup table for a 2-state rule of the given radius, from a wolfram code, an
+	existing table of 2^(2*radius + 1) entries or a rule function (see compile_rule).
+	entry i is the next state of the neighbourhood whose cells, leftmost first, are the
+	bits of i from the most significant down, as in rule_table.
+	"""
+	_check_radius(radius)
+	size = 1 << (2 * radius + 1)
+
+	if callable(rule):
+		return compile_rule(rule, radius)
+
+	if isinstance(rule, (int, np.integer)):
+		rule = int(rule)
+		if rule < 0 or rule >> size:
+			raise ValueError(f"radius {radius} wolfram codes lie in [0, 2^{size}), got {rule}")
+		table = np.array([(rule >> i) & 1 for i in range(size)], dtype=np.uint8)
+	else:
+		table = np.array(rule, dtype=np.uint8)
+		if table.shape != (size,) or table.max(initial=0) > 1:
+			raise ValueError(f"radius {radius} tables hold {size} entries of 0 or 1")
+
+	table.flags.writeable = False
+
+	return table
+
+
+def window_index(row, radius):
+	"""
+	neighbourhood index of every cell of a periodic row (or of every row along the last
+	axis of a batch) for a rule of the given radius, accumulated over the sliding windows
+	of a copy of the row padded with its wrapped-around ends.
+	"""
+	row = np.asarray(row, dtype=np.uint8)
+	n = row.shape[-1]
+	padded = np.concatenate([row[..., n - radius :], row, row[..., :radius]], axis=-1)
+
+	idx = np.zeros(row.shape, dtype=np.uint8 if radius < 4 else np.uint16)
+	for m in range(2 * radius + 1):
+		idx <<= 1
+		idx |= padded[..., m : m + n]
+
+	return idx
+
+
+def lut_step(row, table, radius, out=None):
+	"""
+	one generation of a radius-radius rule given by its lookup table (see make_table) on
+	a periodic row of 0/1 cells: the window index of every cell, then one gather.
+	a 2-D array is treated as a batch of independent rows along its last axis.
+	"""
+	return np.take(table, window_index(row, radius), out=out, mode="clip")
+
+
+@lru_cache(maxsize=None)
+def gkl_table(j=1, k=3):
+	"""
+	lookup table of the (j, k) GKL rule (see gkl_step), of radius max(j, k):
+	128 entries for the classic (1, 3).
+	"""
+	r = max(j, k)
+
+	def gkl(cells):
+		if cells[r]:
+			return cells[r - j] | cells[r - k]
+		return cells[r + j] & cells[r + k]
+
+	return compile_rule(gkl, r)
+
+
+def gkl_step(row, j=1, k=3, out=None):
+	"""
+	one generation of the (j, k) GKL rule on a periodic row of 0/1 cells.
+
+	following the rest of the project, a 0 takes the majority of itself and the cells
+	j and k places to its right, a 1 the majority of itself and the cells j and k places
+	to its left. (j, k) = (1, 3) is the classic GKL classifier.
+	with the centre in the vote, maj(0, a, b) = a & b and maj(1, a, b) = a | b, so the
+	centre cell just selects between the two, without any branching.
+	a 2-D array is treated as a batch of independent rows along its last axis.
+	lut_step(row, gkl_table(j, k), max(j, k)) gives the same rows; this form is kept
+	because it needs four rolls where the table needs 2*max(j, k) + 1 window passes.
+	"""
+	row = np.asarray(row, dtype=np.uint8)
+
+	right = np.roll(row, -j, axis=-1) & np.roll(row, -k, axis=-1)
+	left = np.roll(row, j, axis=-1) | np.roll(row, k, axis=-1)
+
+	if out is None:
+		out = np.empty_like(row)
+	np.bitwise_and(row, left, out=out)
+	out |= (row ^ 1) & right
+
+	return out
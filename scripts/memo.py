@@ -0,0 +1,104 @@
+"""
+in-process memoization of simulation results.
+
+a module-level LRUCache lives as long as the process that imported it, so in the
+streamlit server every session (each runs in its own thread) shares the same one.
+entries are evicted least recently used first, both by count and by the total size
+of the numpy arrays they hold. cached arrays are made read-only, since every caller
+gets the same objects back.
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+
+def iv_key(iv):
+	"""short, stable digest of an IV (its length and bit-packed cells)."""
+	iv = np.asarray(iv, dtype=np.uint8)
+	digest = hashlib.blake2b(np.packbits(iv).tobytes(), digest_size=16).hexdigest()
+
+	return f"{len(iv)}:{digest}"
+
+
+def nbytes(value):
+	"""bytes held by the numpy arrays in a value (nested tuples and lists included)."""
+	if isinstance(value, np.ndarray):
+		return value.nbytes
+	if isinstance(value, (tuple, list)):
+		return sum(nbytes(v) for v in value)
+
+	return 0
+
+
+def _freeze(value):
+	if isinstance(value, np.ndarray):
+		value.flags.writeable = False
+	elif isinstance(value, (tuple, list)):
+		for v in value:
+			_freeze(v)
+
+
+class LRUCache:
+
+	def __init__(self, max_entries=256, max_bytes=512 * 2**20):
+		self.max_entries = max_entries
+		self.max_bytes = max_bytes
+		self.entries = OrderedDict()
+		self.size = 0
+		self.hits = 0
+		self.misses = 0
+		self.lock = threading.Lock()
+
+	def __len__(self):
+		return len(self.entries)
+
+	def get(self, key, default=None):
+		with self.lock:
+			if key not in self.entries:
+				self.misses += 1
+				return default
+
+			self.hits += 1
+			self.entries.move_to_end(key)
+			return self.entries[key][0]
+
+	def put(self, key, value):
+		size = nbytes(value)
+		if size > self.max_bytes:
+			return # would evict everything else and still not fit
+
+		_freeze(value)
+		with self.lock:
+			if key in self.entries:
+				self.size -= self.entries.pop(key)[1]
+
+			self.entries[key] = (value, size)
+			self.size += size
+
+			while len(self.entries) > self.max_entries or self.size > self.max_bytes:
+				_, (_, evicted) = self.entries.popitem(last=False)
+				self.size -= evicted
+
+	def memoize(self, key, compute, refresh=False):
+		"""
+		the cached value for key, computing and storing it with compute() on a miss
+		(or always, with refresh=True).
+		"""
+		missing = object()
+		value = missing if refresh else self.get(key, missing)
+		if value is missing:
+			value = compute()
+			self.put(key, value)
+
+		return value
+
+	def clear(self):
+		with self.lock:
+			self.entries.clear()
+			self.size = 0
+
+
+# shared by everything in this process, keyed on (engine, rule or (j, k), iv_key(IV), generations)
+results = LRUCache()
@@ -1,119 +1,83 @@
+import sys
 import numpy as np 
-import math
+
+from sweep import run_sweep
+from ivstore import IVStore, is_store, load_ivs
+from instrument import RunStats
+from readout import rule184_accuracy
 
 """
 generate a large set of initial vectors with densities
 close to 0.5 and store them with their correct classification
 to form a test set. 
 
-pass that into this and create instances to test on all
+pass that into this to test on all
 these ivs for a number of (j, k) combos (which you have to list too)
 
 """
 
-class GKL:
-
-	def __init__(self, iv, density):
-		
-		self.iv = iv
-		self.density = density
-		
-
-	
-	def apply_rule(self, quintuple):
-
-		mk, mj, x, pj, pk = quintuple
-		
-		if x == 0:
-			# maj(mk, mj, x)
-			return int(math.floor(0.5 * (mk + mj + x)))
-		else:
-			# maj(x, pj, pk)
-			return int(math.floor(0.5 * (x + pj + pk)))
-
-
-
-	def run_automaton(self, j, k):
-
-		prev = self.iv
-		
-		density = self.density #this will change with evolution
-		
-		ctr = 0		 
-		while (density < 1 and density > 0):
-			# not converged yet
-			all_quintuples = np.stack(
-				[np.roll(prev, -k),
-				 np.roll(prev, -j),
-				 prev,
-				 np.roll(prev, j),
-				 np.roll(prev, k)
-				]
-				)
-
-			arr = []
-			for i in np.apply_along_axis(self.apply_rule, 0, all_quintuples):
-				arr.append(i)
-
-			prev = np.array(arr, dtype=np.int64)
-
-			#calculate the new density
-			density = np.count_nonzero(prev == 1)/len(self.iv)
-			ctr += 1			
-
-		return density, ctr
-
-
-
 def fetch(file):
 	f = open(file)
 	array = []
 	line = f.readline()
 
-	while (line != EOF):
-		array.append(line)
+	while (line != ""):
+		if line.strip():
+			array.append(line.strip())
 		line = f.readline()
 
 	f.close()
 	return array
+
+
+def parse_params(lines):
+	# one "j, k" pair per line, optionally in brackets
+	return [tuple(int(x) for x in line.strip("()[] ").split(",")) for line in lines]
 	
 
 
-def main():
+def main(workers=None, stats=None):
 
 	# read (j, k) from a file
 	# read (iv, density, maj_elmnt) from a file
 	# in both cases, the delimiter is assumed to be \n
+	# workers is the number of processes the sweep is spread over (all cores by default)
+	# stats is an optional instrument.RunStats, printed at the end
 
-	param_list = fetch("param_list.txt")
-	iv_list = fetch("iv_list.txt")
+	param_list = parse_params(fetch("param_list.txt"))
+	# either a binary IV store or the old one-vector-per-line text format, see ivstore.py
+	if is_store("iv_list.txt"):
+		cells = IVStore("iv_list.txt") # the sweep workers map the store directly
+		actual = np.array(cells.majority, dtype=np.int64)
+	else:
+		cells, densities, actual = load_ivs("iv_list.txt")
 
-	trial_log = {"Idx:": "(actual, preds, difference, timesteps)"}
+	# GKL-type rules settle well within twice the lattice length, if they settle at all
+	limit = 2 * cells.shape[1]
 
-	for param, idx in  enumerate(param_list):
-		j, k = param
-		actual, preds, difference, timesteps = [], [], [], []
+	# every (j, k) x IV-shard is evolved in a process pool, see sweep.run_sweep
+	all_densities, all_timesteps = run_sweep(cells, param_list, limit, workers, stats=stats)
 
-		for iv in iv_list:
-			cells, density, maj_elmnt = iv
-			actual.append(maj_elmnt)
+	trial_log = {}
 
-			instance = GKL(cells, density)
-			maj_elmnt_, steps = instance.run_automaton(j, k)
+	for (j, k), densities_, timesteps in zip(param_list, all_densities, all_timesteps):
+		preds = densities_.astype(np.int64) # unconverged rows count as 0
+		difference = actual - preds
 
-			preds.append(maj_elmnt_)
-			timesteps.append(steps)
+		trial_log[f"j{j}_k{k}"] = np.stack([actual, preds, difference, timesteps])
+		print(f"(j, k) = ({j}, {k}): success rate {100 * np.mean(difference == 0)}%, mean steps {timesteps.mean()}")
 
-		actual = np.array(actual, np.int64)
-		preds = np.array(preds, np.int64)
-		timesteps = np.array(timesteps, np.int64)
-		difference = actual - preds
+	# one (4, n_ivs) array per (j, k): actual, preds, difference, timesteps
+	np.savez("trial_logs.npz", **trial_log)
 
-		
-		trial_log.update(idx: (actual, preds, difference, timesteps))
+	# rule 184 on the same IVs, for comparison, see readout.py
+	print(f"rule 184: success rate {100 * rule184_accuracy(cells, actual)}%")
 
-	f = open("trial_logs.txt", "r+")
-	f.write(trial_log)
-	f.close()	
+	if stats:
+		print(stats.report())
 
-main()
\ No newline at end of file
+if __name__ == "__main__":
+	# usage: python modified_GKL.py [workers] [--stats]
+	# the process pool re-imports this module in its workers on some platforms
+	args = [a for a in sys.argv[1:] if a != "--stats"]
+	main(int(args[0]) if args else None, RunStats(trace_memory=True) if "--stats" in sys.argv else None)
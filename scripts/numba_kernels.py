@@ -0,0 +1,145 @@
+"""
+numba-compiled stepping kernels (optional: numba need not be installed).
+
+each kernel walks a row once, reading the neighbours and looking up the next state,
+so a generation makes no temporary arrays. the single-row kernels only step (the
+callers count the 1s, as they do with the numpy kernels); the GKL ensemble loop also
+counts the 1s and checks convergence after every step, and runs every IV to the end
+on its own, in parallel over the IVs.
+
+processes of a pool (ga.py, sweep.py) already keep every core busy, so they call
+limit_threads first and the parallel loop runs on one thread in each of them.
+
+without numba the same functions are plain python (far too slow to use); backend.py
+only offers them when available is true.
+"""
+import numpy as np
+
+try:
+	import numba
+except ImportError:
+	numba = None
+
+available = numba is not None
+
+
+def _jit(parallel=False):
+	if not available:
+		return lambda fn: fn
+
+	return numba.njit(cache=True, nogil=True, parallel=parallel)
+
+
+_prange = numba.prange if available else range
+
+
+def limit_threads(n=1):
+	"""let the parallel kernels of this process use at most n threads."""
+	if available:
+		numba.set_num_threads(max(1, min(n, numba.config.NUMBA_NUM_THREADS)))
+
+
+# the rows are stepped in two parts: the cells whose neighbours wrap around the ends,
+# with the index arithmetic that takes, and all the others in one loop over shifted
+# views of the row, with no index arithmetic or branches, which the compiler vectorises
+
+@_jit()
+def _eca_row(row, table, dst):
+	n = len(row)
+	for i in (0, n - 1):
+		dst[i] = table[(row[(i - 1) % n] << 2) | (row[i] << 1) | row[(i + 1) % n]]
+
+	left, centre, right, inner = row[: n - 2], row[1 : n - 1], row[2:], dst[1 : n - 1]
+	for i in range(n - 2):
+		inner[i] = table[(left[i] << 2) | (centre[i] << 1) | right[i]]
+
+
+@_jit()
+def _eca_rows(rows, table, out):
+	for b in range(rows.shape[0]):
+		_eca_row(rows[b], table, out[b])
+
+
+@_jit()
+def _gkl_row(row, j, k, dst):
+	# 0 <= j, k < len(row)
+	n = len(row)
+	m = max(j, k)
+	for i in range(m):
+		dst[i] = (row[i] & (row[(i - j) % n] | row[(i - k) % n])) | ((row[i] ^ 1) & row[(i + j) % n] & row[(i + k) % n])
+	for i in range(max(m, n - m), n):
+		dst[i] = (row[i] & (row[(i - j) % n] | row[(i - k) % n])) | ((row[i] ^ 1) & row[(i + j) % n] & row[(i + k) % n])
+
+	if n > 2 * m:
+		centre, inner = row[m : n - m], dst[m : n - m]
+		left_j, left_k = row[m - j : n - m - j], row[m - k : n - m - k]
+		right_j, right_k = row[m + j : n - m + j], row[m + k : n - m + k]
+		for i in range(n - 2 * m):
+			c = centre[i]
+			inner[i] = (c & (left_j[i] | left_k[i])) | ((c ^ np.uint8(1)) & right_j[i] & right_k[i])
+
+
+@_jit()
+def _gkl_rows(rows, j, k, out):
+	for b in range(rows.shape[0]):
+		_gkl_row(rows[b], j, k, out[b])
+
+
+@_jit(parallel=True)
+def _gkl_ensemble(cells, j, k, limit, counts, steps):
+	n_ivs, n = cells.shape
+	for b in _prange(n_ivs):
+		row = cells[b].copy()
+		nxt = np.empty(n, dtype=np.uint8)
+
+		count = 0
+		for i in range(n):
+			count += row[i]
+
+		s = 0
+		while s < limit and 0 < count < n:
+			_gkl_row(row, j, k, nxt)
+			count = 0
+			for i in range(n):
+				count += nxt[i]
+			row, nxt = nxt, row
+			s += 1
+
+		counts[b] = count
+		steps[b] = s
+
+
+def _run(kernel, row, out, *args):
+	# the kernels work on contiguous (rows, cells) uint8 arrays
+	row = np.ascontiguousarray(row, dtype=np.uint8)
+	dst = out if out is not None and out.flags.c_contiguous and out.dtype == np.uint8 else np.empty_like(row)
+	kernel(row.reshape(-1, row.shape[-1]), *args, dst.reshape(-1, row.shape[-1]))
+
+	if out is None:
+		return dst
+	if dst is not out:
+		out[...] = dst
+
+	return out
+
+
+def eca_step(row, table, out=None):
+	"""kernels.eca_step, compiled."""
+	return _run(_eca_rows, row, out, np.ascontiguousarray(table, dtype=np.uint8))
+
+
+def gkl_step(row, j=1, k=3, out=None):
+	"""kernels.gkl_step, compiled."""
+	n = np.shape(row)[-1]
+	return _run(_gkl_rows, row, out, int(j) % n, int(k) % n)
+
+
+def gkl_ensemble(ivs, j=1, k=3, limit=600):
+	"""the result of ensemble.run_ensemble, with each IV run to convergence in one compiled loop."""
+	cells = np.array(ivs, dtype=np.uint8, ndmin=2)
+	counts = np.zeros(len(cells), dtype=np.int64)
+	steps = np.zeros(len(cells), dtype=np.int64)
+	n = cells.shape[1]
+	_gkl_ensemble(cells, int(j) % n, int(k) % n, int(limit), counts, steps)
+
+	return counts / cells.shape[1], steps
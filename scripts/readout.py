@@ -0,0 +1,73 @@
+"""
+reading the density classification off rule 184.
+
+rule 184 relaxes any ring of N cells within N/2 steps to blocks of two or more equal
+cells of the majority symbol, separated by alternating 0s and 1s (and to pure
+alternation at density exactly 0.5). the readout looks for such blocks in whole batches
+of final configurations at once, so rule 184 can be scored on the same IV sets, at the
+same throughput, as the GKL ensemble runs.
+"""
+import numpy as np
+
+from kernels import rule_table, eca_step
+from ivstore import IVStore
+
+# predictions for a configuration with no block of two equal cells (density exactly 0.5),
+# and for one with blocks of both symbols (not relaxed yet)
+UNDECIDED = -1
+UNRELAXED = -2
+
+
+def rule184_readout(states):
+	"""
+	predicted majority for every row of states: 1 if it holds a run of two or more 1s
+	(cyclically), 0 for a run of two or more 0s, UNDECIDED for neither and UNRELAXED
+	for both.
+	"""
+	states = np.array(states, dtype=np.uint8, ndmin=2)
+	nxt = np.roll(states, -1, axis=1)
+
+	ones = (states & nxt).any(axis=1)
+	zeros = ((states | nxt) == 0).any(axis=1)
+
+	predicted = np.full(len(states), UNDECIDED, dtype=np.int8)
+	predicted[ones & ~zeros] = 1
+	predicted[zeros & ~ones] = 0
+	predicted[zeros & ones] = UNRELAXED
+
+	return predicted
+
+
+def run_rule184(ivs, generations=None):
+	"""
+	relax every row of ivs under rule 184 (for length // 2 + 1 steps unless told otherwise)
+	and read off the predicted majority. returns (predicted, final states).
+	"""
+	states = np.array(ivs, dtype=np.uint8, ndmin=2)
+	if generations is None:
+		generations = states.shape[1] // 2 + 1
+
+	table = rule_table(184)
+	nxt = np.empty_like(states)
+	for _ in range(generations):
+		eca_step(states, table, out=nxt)
+		states, nxt = nxt, states
+
+	return rule184_readout(states), states
+
+
+def rule184_predictions(ivs, chunk=10000):
+	"""predicted majorities for an (n, length) array or an IVStore, a chunk of rows at a time."""
+	if isinstance(ivs, IVStore):
+		chunks = (cells for cells, _, _ in ivs.batches(chunk))
+	else:
+		chunks = (ivs[start : start + chunk] for start in range(0, len(ivs), chunk))
+
+	return np.concatenate([run_rule184(cells)[0] for cells in chunks] or [np.zeros(0, np.int8)])
+
+
+def rule184_accuracy(ivs, majority, chunk=10000):
+	"""fraction of IVs whose majority element rule 184 reads off correctly."""
+	predicted = rule184_predictions(ivs, chunk)
+
+	return float(np.mean(predicted == np.asarray(majority)))
@@ -0,0 +1,90 @@
+"""
+space-time diagrams straight to 1-bit images, without going through matplotlib.
+
+a history (any 2-D 0/1 array, or a history.History) becomes a black-on-white image
+with one pixel block per cell, as matshow with the binary colormap drew it. histories
+bigger than the display are downsampled on the server, each pixel taking the majority
+of the block of cells it covers, a strip of rows at a time; small ones are scaled up by
+a whole number so the cells stay sharp.
+"""
+import io
+
+import numpy as np
+from PIL import Image
+
+# rows of the history read at a time while downsampling
+_STRIP = 4096
+
+
+def _downsample(history, fy, fx):
+	generations, length = history.shape
+	out = np.zeros((-(-generations // fy), -(-length // fx)), dtype=np.uint8)
+
+	col_starts = np.arange(0, length, fx)
+	col_sizes = np.diff(np.append(col_starts, length))
+
+	strip = max(fy, _STRIP // fy * fy)
+	for start in range(0, generations, strip):
+		block = np.asarray(history[start : start + strip])
+		full = len(block) // fy * fy
+
+		# number of 1s in every fy x fx block: whole groups of fy rows first, then a short last group
+		sums = block[:full].reshape(-1, fy, length).sum(axis=1, dtype=np.uint32)
+		row_sizes = np.full(len(sums), fy)
+		if full < len(block):
+			sums = np.vstack([sums, block[full:].sum(axis=0, dtype=np.uint32)])
+			row_sizes = np.append(row_sizes, len(block) - full)
+		sums = np.add.reduceat(sums, col_starts, axis=1)
+
+		# each pixel is the majority of the cells its block really covers
+		out[start // fy : start // fy + len(sums)] = 2 * sums >= row_sizes[:, None] * col_sizes[None, :]
+
+	return out
+
+
+def to_pixels(history, width=700, max_height=2000):
+	"""
+	the 0/1 pixel array for a history: downsampled to at most width x max_height pixels,
+	or blown up by a whole factor towards width if it is smaller than that.
+	"""
+	history = history if isinstance(history, np.ndarray) else np.asarray(history)
+	generations, length = history.shape
+
+	fy, fx = -(-generations // max_height), -(-length // width)
+	if fy > 1 or fx > 1:
+		# keep cells square: both axes shrink by the larger factor
+		f = max(fy, fx)
+		return _downsample(history, f, f)
+
+	scale = max(1, min(width // length, max_height // generations))
+	pixels = np.asarray(history, dtype=np.uint8)
+
+	return np.repeat(np.repeat(pixels, scale, axis=0), scale, axis=1) if scale > 1 else pixels
+
+
+def render_image(history, width=700, max_height=2000):
+	"""a mode "1" PIL image of a history, 1s black and 0s white."""
+	pixels = to_pixels(history, width, max_height)
+	height, w = pixels.shape
+
+	# mode "1" rows are packed most significant bit first, and a set bit is white
+	data = np.packbits(pixels ^ 1, axis=1).tobytes()
+
+	return Image.frombytes("1", (w, height), data)
+
+
+def render_png(history, width=700, max_height=2000):
+	"""a 1-bit PNG of a history, as bytes."""
+	buffer = io.BytesIO()
+	render_image(history, width, max_height).save(buffer, format="PNG", optimize=True)
+
+	return buffer.getvalue()
+
+
+def render_tiles(history, tile_rows=1000, width=700):
+	"""
+	yield (first generation, PNG bytes) for consecutive tiles of tile_rows generations,
+	for histories too tall to show as one image.
+	"""
+	for start in range(0, history.shape[0], tile_rows):
+		yield start, render_png(np.asarray(history[start : start + tile_rows]), width, tile_rows)
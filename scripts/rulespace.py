@@ -0,0 +1,224 @@
+"""
+rule-space sweeps: every elementary rule (or a chosen subset) over one batch of IVs.
+
+all rules are evolved together as a (rule, IV, cell) tensor: the neighbourhood index of
+every cell is computed once per generation and looked up in the stacked rule tables with
+a single gather. per rule the sweep reports
+
+	final density       mean density of 1s after the last generation
+	transient / period  of the orbit each IV falls into, found from 64-bit hashes of the
+	                    states (a cycle longer than the run is not seen)
+	compression         zlib-compressed size of each IV's bit-packed history over its raw size,
+	                    a rough proxy for the wolfram class (low for classes 1 and 2,
+	                    close to 1 for class 3)
+
+only one rule of each of the 88 symmetry classes is evolved when that is cheaper, which it
+is for a batch closed under reflection and complement (see symmetric_batch); the CLI
+draws such a batch, so --ivs 64 runs 64 random IVs and their (up to 192) images.
+
+	python rulespace.py --ivs 64 --length 149 --generations 256 --out rules.csv
+"""
+import argparse
+import csv
+import sys
+import zlib
+
+import numpy as np
+
+from kernels import rule_table, eca_index
+from symmetry import canonical, transform_cells, TRANSFORMS, IDENTITY, COMPLEMENT, REFLECT_COMPLEMENT
+
+_PRIME = np.uint64(0x100000001B3)
+
+COLUMNS = ["rule", "final_density", "transient_mean", "transient_max", "period_max", "cycled", "compression"]
+
+
+def state_hashes(packed):
+	"""64-bit hash of every bit-packed state along the last axis."""
+	width = -(-packed.shape[-1] // 8) * 8
+	padded = np.zeros(packed.shape[:-1] + (width,), dtype=np.uint8)
+	padded[..., : packed.shape[-1]] = packed
+	words = padded.view(np.uint64)
+
+	h = np.full(words.shape[:-1], 0xCBF29CE484222325, dtype=np.uint64)
+	for k in range(words.shape[-1]):
+		h ^= words[..., k]
+		h *= _PRIME
+
+	return h
+
+
+def first_repeat(hashes):
+	"""
+	(transient, period) of each row of a (lattices, generations) array of state hashes:
+	the first generation j whose state was seen before, at i, gives transient i and
+	period j - i. both are -1 where no state repeats.
+	"""
+	n, generations = hashes.shape
+	order = np.argsort(hashes, axis=1, kind="stable")
+	values = np.take_along_axis(hashes, order, axis=1)
+
+	# in sorted order, a repeat is the entry right after the first of a group of equal hashes
+	same = values[:, 1:] == values[:, :-1]
+	first = np.ones_like(same)
+	first[:, 1:] = ~same[:, :-1]
+	candidate = same & first
+
+	j = np.where(candidate, order[:, 1:], generations)
+	best = np.argmin(j, axis=1)
+	rows = np.arange(n)
+
+	found = candidate[rows, best]
+	i = order[rows, best]
+	transient = np.where(found, i, -1)
+	period = np.where(found, j[rows, best] - i, -1)
+
+	return transient, period
+
+
+def evolve_rules(ivs, rules, generations):
+	"""
+	run every rule in rules on every row of ivs for generations generations (including the IVs).
+	returns (final states (rule, IV, cell), packed history (generation, rule, IV, bytes)).
+	"""
+	ivs = np.array(ivs, dtype=np.uint8, ndmin=2)
+	tables = np.stack([rule_table(r) for r in rules]).ravel()
+	offset = (8 * np.arange(len(rules), dtype=np.intp))[:, None, None]
+
+	states = np.repeat(ivs[None], len(rules), axis=0)
+	history = np.empty((generations, len(rules), len(ivs), -(-ivs.shape[1] // 8)), dtype=np.uint8)
+
+	for gen in range(generations):
+		if gen:
+			# rule r reads its table at 8 * r + 4*L + 2*C + R
+			states = tables[eca_index(states) + offset]
+		history[gen] = np.packbits(states, axis=-1, bitorder="little")
+
+	return states, history
+
+
+def symmetric_batch(ivs):
+	"""ivs followed by those of their reflections and complements that are not already there."""
+	ivs = np.array(ivs, dtype=np.uint8, ndmin=2)
+	images = np.concatenate([transform_cells(ivs, t) for t in TRANSFORMS])
+	_, first = np.unique(images, axis=0, return_index=True)
+
+	return images[np.sort(first)]
+
+
+def _plan(ivs, rules, symmetry):
+	# which rules to evolve on which rows, and for every requested rule the position of the
+	# evolved rule, the transform linking them and the rows standing in for ivs. with
+	# symmetry only class representatives are evolved, on ivs plus the transformed rows
+	# they need, which pays off when ivs is (nearly) closed under the transforms
+	direct = (rules, ivs, [(pos, IDENTITY, np.arange(len(ivs))) for pos in range(len(rules))])
+	if not symmetry:
+		return direct
+
+	reps = sorted({canonical(r)[0] for r in rules})
+	transforms = sorted({canonical(r)[1] for r in rules}, key=TRANSFORMS.index)
+
+	images = np.concatenate([transform_cells(ivs, t) for t in transforms])
+	batch, inverse = np.unique(images, axis=0, return_inverse=True)
+	if len(reps) * len(batch) >= len(rules) * len(ivs):
+		return direct
+
+	rows = dict(zip(transforms, inverse.reshape(len(transforms), len(ivs))))
+	plan = [(reps.index(canonical(r)[0]), canonical(r)[1], rows[canonical(r)[1]]) for r in rules]
+
+	return reps, batch, plan
+
+
+def sweep_rules(ivs, rules=range(256), generations=256, symmetry=True):
+	"""
+	statistics of every rule in rules over the batch ivs, as a dict of per-rule arrays
+	keyed by COLUMNS, plus "per_iv_transient" and "per_iv_period" of shape (rule, IV).
+	with symmetry only one rule per symmetry class is evolved and the others are derived
+	from it (see symmetry.py); the results are the same either way.
+	"""
+	rules = list(rules)
+	ivs = np.array(ivs, dtype=np.uint8, ndmin=2)
+	evolved, batch, plan = _plan(ivs, rules, symmetry)
+
+	states, history = evolve_rules(batch, evolved, generations)
+	hashes = state_hashes(history).transpose(1, 2, 0).reshape(-1, generations)
+	transient, period = (a.reshape(len(evolved), len(batch)) for a in first_repeat(hashes))
+
+	# transients and periods carry over unchanged to a transformed run, the density of a
+	# complemented one is 1 - density and the history itself is mirrored and/or inverted
+	final_density = np.empty(len(rules))
+	compression = np.empty(len(rules))
+	for i, (pos, t, rows) in enumerate(plan):
+		# counted in integers so a derived density matches the directly computed one exactly
+		ones, cells = int(states[pos, rows].sum(dtype=np.int64)), states[pos, rows].size
+		final_density[i] = (cells - ones if t in (COMPLEMENT, REFLECT_COMPLEMENT) else ones) / cells
+
+		h = history[:, pos, rows]
+		if t != IDENTITY:
+			cells = np.unpackbits(h, axis=-1, count=ivs.shape[1], bitorder="little")
+			h = np.packbits(transform_cells(cells, t), axis=-1, bitorder="little")
+		# each IV's history on its own, so the images in a symmetric batch do not compress each other
+		h = np.ascontiguousarray(h.swapaxes(0, 1))
+		compression[i] = sum(len(zlib.compress(iv_history, 6)) for iv_history in h) / h.nbytes
+
+	transient = np.stack([transient[pos, rows] for pos, _, rows in plan])
+	period = np.stack([period[pos, rows] for pos, _, rows in plan])
+	cycled = period > 0
+
+	with np.errstate(invalid="ignore"):
+		transient_mean = np.where(cycled.any(axis=1), np.sum(np.where(cycled, transient, 0), axis=1) / cycled.sum(axis=1), np.nan)
+
+	return {
+		"rule": np.array(rules),
+		"final_density": final_density,
+		"transient_mean": transient_mean,
+		"transient_max": transient.max(axis=1),
+		"period_max": period.max(axis=1),
+		"cycled": cycled.mean(axis=1),
+		"compression": compression,
+		"per_iv_transient": transient,
+		"per_iv_period": period,
+	}
+
+
+def write_table(result, f):
+	"""write the per-rule columns of a sweep as CSV to the file object f."""
+	writer = csv.writer(f)
+	writer.writerow(COLUMNS)
+	for row in zip(*(result[c] for c in COLUMNS)):
+		writer.writerow([f"{v:.6g}" if isinstance(v, float) else v for v in (x.item() for x in row)])
+
+
+def parse_rules(spec):
+	# "0-255", "30,90,110" or a mix such as "0-15,30,110"
+	rules = []
+	for part in spec.split(","):
+		lo, _, hi = part.partition("-")
+		rules.extend(range(int(lo), int(hi or lo) + 1))
+
+	return rules
+
+
+def main():
+	parser = argparse.ArgumentParser(description="sweep the elementary rules over a batch of IVs")
+	parser.add_argument("--rules", default="0-255", help="e.g. 0-255 or 30,90,110")
+	parser.add_argument("--ivs", type=int, default=64, help="number of random IVs")
+	parser.add_argument("--length", type=int, default=149, help="cells per IV")
+	parser.add_argument("--generations", type=int, default=256)
+	parser.add_argument("--seed", type=int, default=0)
+	parser.add_argument("--out", help="CSV file for the table (standard output by default)")
+	args = parser.parse_args()
+
+	ivs = np.random.default_rng(args.seed).integers(0, 2, (args.ivs, args.length), dtype=np.uint8)
+	ivs = symmetric_batch(ivs)
+	result = sweep_rules(ivs, parse_rules(args.rules), args.generations)
+
+	if args.out:
+		with open(args.out, "w", newline="") as f:
+			write_table(result, f)
+	else:
+		write_table(result, sys.stdout)
+
+
+if __name__ == "__main__":
+	main()
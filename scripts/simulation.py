@@ -1,5 +1,18 @@
+import sys
 import numpy as np
-import math
+
+from kernels import rule_table
+from backend import get_backend
+from ensemble import run_ensemble
+from ivgen import exact_density_ivs
+from dynamics import evolve
+from history import make_history
+from render import render_image
+from instrument import RunStats
+from hashlife import HashLife
+from additive import affine_form, jump, superposition_holds
+from domain import ThreadedStepper
+import batch
 
 random_seed = np.random.RandomState(242976)
 
@@ -11,6 +24,13 @@ class GKL_CA:
 		self.limit_evolution = 0
 		# density => density of 1s in the state array
 		self.density = 0
+		# how the space-time history is stored: "dense", "ring" or "memmap", see history.make_history
+		self.history_mode = "dense"
+		self.history_options = {}
+		# optional instrument.RunStats filled in by run_automaton
+		self.stats = None
+		# worker threads sharing one (very large) lattice, see domain.py; None steps it on one thread
+		self.threads = None
 
 	def trials_set_up(self, density):
 		self.length = 150
@@ -28,30 +48,13 @@ class GKL_CA:
 
 	def init_cells(self):
 		# here we want the exact proportion of 1s to 0s as is specified by user input density
-		K = int(self.length * self.density)
-		arr = np.array([1] * K  +  [0] * (self.length - K))
-		np.random.shuffle(arr)
-		self.cells = arr
+		self.cells = exact_density_ivs([self.density], self.length)[0]
 
 		#print(self.cells)
 
-	def apply_rule(self, quintuple):
-		m3, m1, x, p1, p3 = quintuple
-		x_ = 0
-
-		if x == 0:
-			# maj(m3, m1, x)
-			x_ = int(math.floor(0.5 * (m3 + m1 + x)))
-		else:
-			# maj(x, p1, p3)
-			x_ = int(math.floor(0.5 * (x + p1 + p3)))
-
-		return x_
-
 	def run_automaton(self):
-		history = np.zeros((self.limit_evolution, self.length)) # 2D array
-		#print(history.shape)
-		history[0, :] = self.cells # start here
+		history = make_history(self.history_mode, self.limit_evolution, self.length, **self.history_options)
+		history[0] = self.cells # start here
 
 		density = self.density #this will change with evolution
 		if density == 1 or density == 0:
@@ -59,38 +62,37 @@ class GKL_CA:
 			print("Not interesting behaviour, exeunt.\nIt will be homogeneous from the start to end.\n")
 			exit(1)
 
-		ctr = 1		 
-		while (density < 1 and density > 0 and ctr < self.limit_evolution):
-			# not converged yet
-			all_quintuples = np.stack(
-				[np.roll(history[ctr-1, :], -3),
-				 np.roll(history[ctr-1, :], -1),
-				 history[ctr-1, :],
-				 np.roll(history[ctr-1, :], 1),
-				 np.roll(history[ctr-1, :], 3)
-				]
-				)
-			arr = []
-			for i in np.apply_along_axis(self.apply_rule, 0, all_quintuples):
-				arr.append(i)
-
-			history[ctr, :] = np.array(arr, dtype=np.int64)
-
-			#calculate the new density
-			density = np.count_nonzero(history[ctr, :] == 1)/self.length
-			ctr += 1			
-
-		return history, density, ctr			
+		# stops stepping as soon as the run reaches a fixed point (or any other cycle);
+		# the kernel comes from the numpy or numba backend, see backend.py
+		step = get_backend().gkl_step
+		with ThreadedStepper(lambda prev: step(prev, 1, 3), 3, self.threads) as threaded:
+			kernel = threaded if self.threads else lambda prev, out=None: step(prev, 1, 3, out=out)
+			self.transient, self.period, counts = evolve(history, kernel, self.stats)
+
+		# homogeneous states are fixed points, so the run converged at the first one
+		homogeneous = np.flatnonzero((counts == 0) | (counts == self.length))
+		ctr = int(homogeneous[0]) + 1 if len(homogeneous) else self.limit_evolution
+		density = counts[ctr - 1] / self.length
+
+		return np.asarray(history), density, ctr			
 
 	
 
 class E_CA:
 
 	def __init__(self):
+		self.rule_num = 0
 		self.ruleset = []
 		self.length = 0
 		self.cells = []
 		self.generations = 0
+		# how the space-time history is stored: "dense", "ring" or "memmap", see history.make_history
+		self.history_mode = "dense"
+		self.history_options = {}
+		# optional instrument.RunStats filled in by run_automaton
+		self.stats = None
+		# worker threads sharing one (very large) lattice, see domain.py; None steps it on one thread
+		self.threads = None
 
 	def set_properties(self):
 		self.length = int(input("\nEnter the length of the 1-D CA: "))
@@ -99,31 +101,27 @@ class E_CA:
 	
 		rule_num = int(input("\nEnter integer rule number for this automaton: "))
 
-		f = open("rules.txt", "r")
-		ruleset_str = f.readlines()[rule_num][: : -1] #reversing to avoid incorrect mapping
-		#print(ruleset_str)
-		self.ruleset = [char for char in ruleset_str][1:] # first char in this list is '\n' so reading from char 2 on
-		#print(self.ruleset)
-		f.close()	
+		# bit i of the rule number is the next state of neighbourhood i = 4*L + 2*C + R
+		self.rule_num = rule_num
+		self.ruleset = rule_table(rule_num)
 		
 
 	def init_cells(self):
 		"""
 		Cases to add:
 
-		1. to check the additive property
-		2. to probe the behaviour of ideal rules
+		1. to probe the behaviour of ideal rules
 		
 		"""
-		type_init = input("\nEnter a for random initialization.\nEnter b to initialize only the middle cell to '1'.\nEnter c to invert case b.\n\nEnter your choice here:")
+		type_init = input("\nEnter a for random initialization.\nEnter b to initialize only the middle cell to '1'.\nEnter c to invert case b.\nEnter d to check the additive property on the sum of two random IVs.\n\nEnter your choice here:")
 
 		ctr = 0
-		while type_init not in "abcmj":
+		while type_init not in "abcdmj":
 			if ctr > 4:
 				print("\nToo many wrong tries, bubye.\n")
 				exit(1)
 
-			type_init = input("\nInvalid input! Choose from a, b or c: ")
+			type_init = input("\nInvalid input! Choose from a, b, c or d: ")
 
 		if type_init == "a":
 			self.cells = random_seed.randint(0, 2, self.length)
@@ -138,6 +136,13 @@ class E_CA:
 			m = (self.length//2) - 1
 			self.cells[m] = 0
 
+		elif type_init == "d":
+			# x xor y evolves into the xor of the images of x and y iff the rule is additive
+			x, y = random_seed.randint(0, 2, (2, self.length))
+			self.cells = x ^ y
+			holds = superposition_holds(self.rule_num, x, y, self.generations - 1)
+			print(f"\nSuperposition {'holds' if holds else 'fails'} for rule {self.rule_num} after {self.generations - 1} generations.\n")
+
 		elif type_init == "mj":
 			string = "0110100001101001001000000111011101100101001000000110110001101111011101100110010100100000011110010110111101110101"
 			self.length = len(string)
@@ -150,47 +155,39 @@ class E_CA:
 
 		#print(self.cells)
 
-	def rule_id(self, triple):
-		L, C, R = triple
-		s = str(int(L)) + str(int(C)) + str(int(R))
-		index = int(s, 2) # parse a binary number not decimal
-
-		return index
-
 	def run_automaton(self):
-		ruleset = self.ruleset
-
-		history = np.zeros((self.generations, self.length)) # 2D array
-		#print(history.shape)
-		history[0, :] = self.cells # start here
+		table = self.ruleset # uint8 lookup table, see kernels.rule_table
 
-		for gen in range(1, self.generations):
-			all_triples = np.stack(
-				[
-				np.roll(history[gen - 1, :], 1),
-				history[gen - 1, :],
-				np.roll(history[gen - 1, :], -1)
-				]
-				)
-			#print(np.apply_along_axis(self.rule_id, 0, all_triples))
+		history = make_history(self.history_mode, self.generations, self.length, **self.history_options)
+		history[0] = self.cells # start here
 
-			temp = []
-			for i in np.apply_along_axis(self.rule_id, 0, all_triples):
-				temp.append(ruleset[i])
+		# neighbourhood index 4*L + 2*C + R looked up in the rule table for the whole row,
+		# stopping early (and copying the cycle) once the run falls into a fixed point or cycle
+		step = get_backend().eca_step
+		with ThreadedStepper(lambda prev: step(prev, table), 1, self.threads) as threaded:
+			kernel = threaded if self.threads else lambda prev, out=None: step(prev, table, out=out)
+			self.transient, self.period, _ = evolve(history, kernel, self.stats)
 
-			temp = np.array(temp, dtype=np.int64)
+		return np.asarray(history), None, None	
 
-			history[gen, :] = temp
+	def snapshots(self, times):
+		# rows at arbitrary (possibly huge) generations without stepping through the ones
+		# in between: additive rules jump directly (additive.py), the others use hashlife.py
+		if affine_form(self.rule_num) is not None:
+			return np.array([jump(self.cells, self.rule_num, t) for t in times], dtype=np.uint8).reshape(len(times), len(self.cells))
 
-		return history, None, None	
+		return HashLife(self.rule_num).snapshots(self.cells, times)
 
 
-def run_trials(n = 100):
+def run_trials(n = 100, stats = None):
 
 	actual, predicted, time = [], [], []
 
-	for trial in range(n):
-		density = np.random.uniform(0,1)
+	setup = GKL_CA()
+	setup.trials_set_up(0)
+
+	densities = np.random.uniform(0, 1, n)
+	for density in densities:
 		if density > 0.5:
 			majority = 1
 		elif density < 0.5:
@@ -199,30 +196,33 @@ def run_trials(n = 100):
 			majority = None
 		actual.append(majority)
 
-		instance = GKL_CA()
-		instance.trials_set_up(density)
-		instance.init_cells()
+	# exact proportion of 1s in every row, as in GKL_CA.init_cells
+	ivs = exact_density_ivs(densities, setup.length)
 
-		data, density_, steps = instance.run_automaton()
-		predicted.append(int(density_))
-		time.append(steps)
+	# all trials are evolved together, see ensemble.run_ensemble
+	densities_, steps = run_ensemble(ivs, 1, 3, setup.limit_evolution, stats)
+	predicted = [int(d) for d in densities_]
+	time = list(steps)
 
 	return actual, predicted, time
 	
 
 def plot_sim(data):
-	import matplotlib.pyplot as plt 
-	plt.rcParams['image.cmap'] = 'binary'
-
-	fig, ax = plt.subplots(figsize=(16, 9))
-	ax.matshow(data)
-	ax.axis(False)
-
-	plt.show()
+	# the history goes straight to a 1-bit image (downsampled if needed), see render.py
+	render_image(data).show()
 
 def main():
 
 	CA = None
+	# pass --stats to print timing and memory diagnostics for the run
+	stats = RunStats(trace_memory=True) if "--stats" in sys.argv else None
+	# pass --threads N to step one large lattice on N threads
+	threads = int(sys.argv[sys.argv.index("--threads") + 1]) if "--threads" in sys.argv else None
+
+	# pass --batch JOBS [--out RESULTS] to run the jobs of a job file without any prompts, see batch.py
+	if "--batch" in sys.argv:
+		exit(batch.main(sys.argv[sys.argv.index("--batch") + 1 :]))
+
 	mode = input("\nWelcome to CASa Blanka - Everything is black and white but that's only the beginning.\
 		\nTo explore Elementary CAs, enter 'E'.\
 		\nTo explore the GKL CA, enter 'GKL' \
@@ -241,7 +241,7 @@ def main():
 		elif choice == "trial":
 			num_trials = int(input("\nEnter the number of trials you want to run: "))
 			print("\nRunning trials...\n")
-			actual, predicted, time = run_trials(num_trials)
+			actual, predicted, time = run_trials(num_trials, stats)
 
 			# print(actual)
 			# print(predicted)
@@ -250,18 +250,29 @@ def main():
 			success_rate = 100 * (len(res) - np.count_nonzero(res))/len(res)
 
 			print(f"The success rate for this set of trials is {success_rate}%.\n")
+			if stats:
+				print(stats.report())
 
 			exit(1)
 
 
 	CA.set_properties()
 	CA.init_cells()
+	CA.stats = stats
+	CA.threads = threads
 	data, density, steps = CA.run_automaton()
 	
 	if density != None:
 		print(f"The majority element is {int(density)} and the automaton converged in {steps} steps.\n")
 
+	elif CA.period:
+		print(f"The automaton falls into a cycle of period {CA.period} after {CA.transient} generations.\n")
+
+	if stats:
+		print(stats.report())
+
 	plot_sim(data)
 
 
-main()	
\ No newline at end of file
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,96 @@
+"""
+parallel (j, k) parameter sweeps over a shared set of initialization vectors.
+
+the IVs are written once to a memory-mapped .npy file that every worker opens
+read-only (an ivstore.IVStore is opened directly), so each work unit only carries
+(j, k) and a row range instead of a pickled copy of its shard. the results land in preallocated (n_params, n_ivs)
+arrays by position, so the output does not depend on the order in which the
+work units finish.
+"""
+import os
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from ensemble import run_ensemble
+from ivstore import IVStore, is_store
+from instrument import RunStats
+from numba_kernels import limit_threads
+
+# memmaps already opened by this worker process, keyed by path
+_open_ivs = {}
+
+
+def mendonca_params(max_j):
+	"""the (j, 3j) neighbourhoods for j = 1..max_j."""
+	return [(j, 3 * j) for j in range(1, max_j + 1)]
+
+
+def _rows(ivs, start, stop):
+	if isinstance(ivs, IVStore):
+		return ivs.rows(start, stop)
+
+	return ivs[start:stop]
+
+
+def _run_unit(path, j, k, start, stop, limit, trace_memory):
+	if path not in _open_ivs:
+		_open_ivs[path] = IVStore(path) if is_store(path) else np.load(path, mmap_mode="r")
+
+	# trace_memory is None when the sweep is not instrumented
+	stats = RunStats(trace_memory) if trace_memory is not None else None
+	densities, steps = run_ensemble(_rows(_open_ivs[path], start, stop), j, k, limit, stats)
+
+	return densities, steps, stats
+
+
+def run_sweep(ivs, params, limit=600, workers=None, shard_size=10000, stats=None):
+	"""
+	run the GKL rule for every (j, k) in params on every row of ivs (an array or an IVStore).
+
+	work is split into (j, k) x IV-shard units of at most shard_size rows, spread over
+	a pool of workers processes (os.cpu_count() by default; 1 runs everything inline).
+	returns (densities, steps), both of shape (len(params), n_ivs), as in run_ensemble.
+	the stats of every work unit are merged into stats (an instrument.RunStats), if given.
+	"""
+	if not isinstance(ivs, IVStore):
+		ivs = np.asarray(ivs, dtype=np.uint8)
+	n_ivs = len(ivs)
+	workers = workers or os.cpu_count() or 1
+
+	densities = np.zeros((len(params), n_ivs))
+	steps = np.zeros((len(params), n_ivs), dtype=np.int64)
+
+	shards = [(start, min(start + shard_size, n_ivs)) for start in range(0, n_ivs, shard_size)]
+
+	if workers == 1:
+		for p, (j, k) in enumerate(params):
+			for start, stop in shards:
+				densities[p, start:stop], steps[p, start:stop] = run_ensemble(_rows(ivs, start, stop), j, k, limit, stats)
+
+		return densities, steps
+
+	tmp = tempfile.mkdtemp(prefix="ca_sweep_")
+	try:
+		if isinstance(ivs, IVStore):
+			path = ivs.path
+		else:
+			path = os.path.join(tmp, "ivs.npy")
+			np.save(path, ivs)
+
+		with ProcessPoolExecutor(max_workers=workers, initializer=limit_threads) as pool:
+			futures = {}
+			for p, (j, k) in enumerate(params):
+				for start, stop in shards:
+					futures[(p, start, stop)] = pool.submit(_run_unit, path, j, k, start, stop, limit, None if stats is None else stats.trace_memory)
+
+			for (p, start, stop), future in futures.items():
+				densities[p, start:stop], steps[p, start:stop], unit_stats = future.result()
+				if stats is not None:
+					stats.merge(unit_stats)
+	finally:
+		shutil.rmtree(tmp, ignore_errors=True)
+
+	return densities, steps
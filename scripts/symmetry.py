@@ -0,0 +1,73 @@
+"""
+symmetries of the elementary rules.
+
+swapping left and right (reflection) and swapping 0 and 1 (complement) turn every
+elementary rule into another one, and split the 256 rules into 88 classes. a rule r
+obtained from its class representative by the transform t behaves exactly like the
+representative on transformed cells:
+
+	history(r, iv) == transform_cells(history(rep, transform_cells(iv, t)), t)
+
+so anything computed for a representative can be mirrored and/or inverted into the
+result for every other rule in its class.
+"""
+from functools import lru_cache
+
+import numpy as np
+
+IDENTITY = "identity"
+REFLECT = "reflect"
+COMPLEMENT = "complement"
+REFLECT_COMPLEMENT = "reflect+complement"
+
+TRANSFORMS = (IDENTITY, REFLECT, COMPLEMENT, REFLECT_COMPLEMENT)
+
+
+def _check(rule_num):
+	if not 0 <= rule_num <= 255:
+		raise ValueError(f"elementary rules are numbered 0 - 255, got {rule_num}")
+
+
+def transform_rule(rule_num, t):
+	"""the rule that t turns rule_num into (every transform is its own inverse)."""
+	_check(rule_num)
+	out = 0
+	for idx in range(8):
+		l, c, r = idx >> 2, (idx >> 1) & 1, idx & 1
+		if t in (REFLECT, REFLECT_COMPLEMENT):
+			l, r = r, l
+		bit = (rule_num >> (4 * l + 2 * c + r)) & 1
+		if t in (COMPLEMENT, REFLECT_COMPLEMENT):
+			bit = 1 - ((rule_num >> (7 - (4 * l + 2 * c + r))) & 1)
+		out |= bit << idx
+
+	return out
+
+
+def transform_cells(cells, t):
+	"""apply t to a row, a batch of rows or a history, along the last (cell) axis."""
+	cells = np.asarray(cells)
+	if t in (REFLECT, REFLECT_COMPLEMENT):
+		cells = cells[..., ::-1]
+	if t in (COMPLEMENT, REFLECT_COMPLEMENT):
+		return 1 - cells
+
+	return np.ascontiguousarray(cells)
+
+
+@lru_cache(maxsize=None)
+def canonical(rule_num):
+	"""(representative, t): the smallest rule in rule_num's class, and the transform linking them."""
+	_check(rule_num)
+	images = [(transform_rule(rule_num, t), t) for t in TRANSFORMS]
+
+	return min(images, key=lambda image: image[0])
+
+
+def classes():
+	"""{representative: [rules in its class]} for all 256 rules."""
+	out = {}
+	for rule_num in range(256):
+		out.setdefault(canonical(rule_num)[0], []).append(rule_num)
+
+	return out
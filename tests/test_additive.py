@@ -0,0 +1,50 @@
+"""additive jumps against stepping the kernels generation by generation."""
+import numpy as np
+import pytest
+
+from additive import affine_form, is_additive, jump, superposition_holds
+from kernels import eca_step, rule_table
+
+AFFINE = [rule for rule in range(256) if affine_form(rule) is not None]
+
+
+def test_affine_rules():
+	assert len(AFFINE) == 16
+	assert [rule for rule in range(256) if is_additive(rule)] == [0, 60, 90, 102, 150, 170, 204, 240]
+
+
+@pytest.mark.parametrize("rule", AFFINE)
+@pytest.mark.parametrize("length", [1, 2, 17, 64, 65, 130])
+def test_jump(rule, length):
+	row = np.random.default_rng(rule + length).integers(0, 2, length, dtype=np.uint8)
+	table = rule_table(rule)
+
+	stepped, now = row, 0
+	for t in [0, 1, 2, 5, 64, 99, 256, 1001]:
+		for _ in range(t - now):
+			stepped = eca_step(stepped, table)
+		now = t
+		assert np.array_equal(jump(row, rule, t), stepped), t
+
+
+def test_jump_rejects():
+	with pytest.raises(ValueError):
+		jump(np.zeros(8, dtype=np.uint8), 110, 3)
+	with pytest.raises(ValueError):
+		jump(np.zeros(8, dtype=np.uint8), 90, -1)
+
+
+@pytest.mark.parametrize("rule, t, holds", [
+	(90, 50, True),
+	(150, 51, True),
+	(30, 50, False),
+	(110, 50, False),
+	# rule 105 is 150 xor 1: after t generations the constant is t mod 2, which cancels for even t
+	(105, 50, True),
+	(105, 51, False),
+])
+def test_superposition(rule, t, holds):
+	rng = np.random.default_rng(rule + t)
+	x, y = rng.integers(0, 2, (2, 101), dtype=np.uint8)
+
+	assert superposition_holds(rule, x, y, t) == holds
@@ -0,0 +1,53 @@
+"""packed lattices against the uint8 kernels."""
+import numpy as np
+import pytest
+
+from bitpack import PackedLattice, pack, popcount, unpack
+from kernels import eca_step, gkl_step, rule_table
+
+# lengths around the word size, where the carries and the wrap-around patches meet
+LENGTHS = [5, 63, 64, 65, 127, 128, 129, 200]
+
+
+def _rows(length, count=4, seed=0):
+	return np.random.default_rng(seed + length).integers(0, 2, (count, length), dtype=np.uint8)
+
+
+@pytest.mark.parametrize("length", LENGTHS)
+def test_pack_round_trip(length):
+	for row in _rows(length):
+		words = pack(row)
+		assert np.array_equal(unpack(words, length), row)
+		assert popcount(words) == row.sum()
+
+
+@pytest.mark.parametrize("length", LENGTHS)
+def test_shifted_and_rotated(length):
+	for row in _rows(length):
+		lattice = PackedLattice.from_cells(row)
+		for s in range(-min(63, length - 1), min(64, length)):
+			assert np.array_equal(unpack(lattice.shifted(s), length), np.roll(row, s)), s
+		for s in (-3 * length - 1, -length, 0, 1, length // 2, 70, 5 * length + 2):
+			assert np.array_equal(unpack(lattice.rotated(s), length), np.roll(row, s)), s
+
+
+@pytest.mark.parametrize("length", LENGTHS)
+def test_step_eca_all_rules(length):
+	rows = _rows(length, 2)
+	for rule in range(256):
+		for row in rows:
+			stepped = PackedLattice.from_cells(row).step_eca(rule)
+			assert np.array_equal(stepped.to_cells(), eca_step(row, rule_table(rule))), rule
+			# the padding bits past the end of the ring stay clear
+			assert stepped.count() == stepped.to_cells().sum()
+
+
+@pytest.mark.parametrize("length", [7, 64, 65, 149, 200])
+@pytest.mark.parametrize("j, k", [(1, 3), (2, 5), (3, 1), (6, 6)])
+def test_step_gkl(length, j, k):
+	for row in _rows(length):
+		lattice = PackedLattice.from_cells(row)
+		expected = row
+		for _ in range(5):
+			lattice, expected = lattice.step_gkl(j, k), gkl_step(expected, j, k)
+			assert np.array_equal(lattice.to_cells(), expected)
@@ -0,0 +1,83 @@
+"""early exit and cycle copying in every history mode, against plain stepping."""
+import numpy as np
+import pytest
+
+from dynamics import evolve, iter_evolve
+from history import make_history
+from kernels import eca_step, gkl_step, rule_table
+
+GENERATIONS = 200
+
+RULES = [0, 4, 8, 30, 54, 90, 108, 110, 150, 184, 232]
+LENGTHS = [1, 5, 16, 33]
+
+# (mode, packed, keep): keep=3 is shorter than most periods, so the cycle has to be stepped again
+MODES = [("dense", False, None), ("dense", True, None), ("ring", False, 64), ("ring", True, 3), ("memmap", False, None), ("memmap", True, None)]
+
+
+def stepped(row, step, generations=GENERATIONS):
+	rows = [row]
+	for _ in range(generations - 1):
+		rows.append(step(rows[-1]))
+
+	return np.stack(rows)
+
+
+def first_repeat(rows):
+	# (transient, period) of the first state seen again, or (None, None)
+	seen = {}
+	for gen, row in enumerate(rows):
+		key = row.tobytes()
+		if key in seen:
+			return seen[key], gen - seen[key]
+		seen[key] = gen
+
+	return None, None
+
+
+def check(row, step, mode, packed, keep):
+	expected = stepped(row, step)
+	history = make_history(mode, GENERATIONS, len(row), packed=packed, keep=keep)
+	history[0] = row
+
+	transient, period, counts = evolve(history, lambda prev, out=None: step(prev, out=out))
+
+	held = np.asarray(history)
+	np.testing.assert_array_equal(held, expected[len(expected) - len(held):])
+	np.testing.assert_array_equal(counts, expected.sum(axis=1))
+
+	expected_transient, expected_period = first_repeat(expected)
+	if period is not None:
+		assert (transient, period) == (expected_transient, expected_period)
+	elif expected_period is not None:
+		# a cycle may be seen late, but not this late
+		assert 4 * (expected_transient + expected_period) > GENERATIONS
+
+
+@pytest.mark.parametrize("mode, packed, keep", MODES)
+@pytest.mark.parametrize("length", LENGTHS)
+@pytest.mark.parametrize("rule", RULES)
+def test_eca(rule, length, mode, packed, keep):
+	row = np.random.default_rng(rule * 100 + length).integers(0, 2, length, dtype=np.uint8)
+	table = rule_table(rule)
+	check(row, lambda prev, out=None: eca_step(prev, table, out=out), mode, packed, keep)
+
+
+@pytest.mark.parametrize("mode, packed, keep", MODES)
+@pytest.mark.parametrize("length", [7, 49, 149])
+@pytest.mark.parametrize("density", [0.3, 0.5, 0.7])
+def test_gkl(density, length, mode, packed, keep):
+	row = (np.random.default_rng(length).random(length) < density).astype(np.uint8)
+	check(row, lambda prev, out=None: gkl_step(prev, 1, 3, out=out), mode, packed, keep)
+
+
+def test_stream():
+	row = np.random.default_rng(0).integers(0, 2, 64, dtype=np.uint8)
+	table = rule_table(30)
+	history = make_history("dense", 1000, len(row))
+	history[0] = row
+
+	run = iter_evolve(history, lambda prev, out=None: eca_step(prev, table, out=out), first_block=16)
+	filled = list(run)
+	assert filled == [16, 32, 64, 128, 256, 512, 1000]
+	np.testing.assert_array_equal(np.asarray(history), stepped(row, lambda prev: eca_step(prev, table), 1000))
@@ -0,0 +1,52 @@
+"""hashlife jumps against stepping the kernels generation by generation."""
+import numpy as np
+import pytest
+
+from hashlife import HashLife
+from kernels import eca_step, rule_table
+
+
+def _stepped(row, rule, times):
+	# the row at every generation in times (ascending), stepped one generation at a time
+	table, out, now = rule_table(rule), [], 0
+	for t in times:
+		for _ in range(t - now):
+			row = eca_step(row, table)
+		now = t
+		out.append(row)
+
+	return out
+
+
+@pytest.mark.parametrize("rule", [30, 54, 90, 110, 184, 18])
+@pytest.mark.parametrize("length", [1, 13, 64, 65, 100, 257])
+def test_advance(rule, length):
+	row = np.random.default_rng(rule * 1000 + length).integers(0, 2, length, dtype=np.uint8)
+	times = [0, 1, 2, 3, 7, 31, 64, 100, 129, 257]
+	life = HashLife(rule)
+
+	for t, expected in zip(times, _stepped(row, rule, times)):
+		assert np.array_equal(life.advance(row, t), expected), t
+
+
+def test_snapshots_in_any_order():
+	row = np.random.default_rng(1).integers(0, 2, 150, dtype=np.uint8)
+	times = [200, 3, 77, 0, 77]
+	expected = dict(zip(sorted(times), _stepped(row, 110, sorted(times))))
+
+	snapshots = HashLife(110).snapshots(row, times)
+	for t, snapshot in zip(times, snapshots):
+		assert np.array_equal(snapshot, expected[t])
+
+
+def test_jump_and_eviction():
+	# a node budget too small for the run, so the tables are cleared along the way
+	row = np.random.default_rng(2).integers(0, 2, 300, dtype=np.uint8)
+	life = HashLife(30, max_nodes=10)
+
+	assert np.array_equal(life.jump(row, 8), _stepped(row, 30, [256])[0])
+
+
+def test_negative_time():
+	with pytest.raises(ValueError):
+		HashLife(110).advance(np.zeros(10, dtype=np.uint8), -1)
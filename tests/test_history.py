@@ -0,0 +1,61 @@
+"""the history modes against a plain array of the same rows."""
+import numpy as np
+import pytest
+
+from history import make_history, RingHistory
+
+GENERATIONS = 50
+LENGTH = 13
+
+
+def rows(seed=0):
+	return np.random.default_rng(seed).integers(0, 2, (GENERATIONS, LENGTH), dtype=np.uint8)
+
+
+@pytest.mark.parametrize("packed", [False, True])
+@pytest.mark.parametrize("mode, keep", [("dense", None), ("ring", 7), ("ring", 50), ("memmap", None)])
+def test_write_and_read(mode, keep, packed):
+	expected = rows()
+	history = make_history(mode, GENERATIONS, LENGTH, packed=packed, keep=keep)
+	for gen, row in enumerate(expected):
+		history[gen] = row
+		np.testing.assert_array_equal(history[gen], row)
+
+	held = np.asarray(history)
+	assert held.dtype == np.uint8
+	np.testing.assert_array_equal(held, expected[GENERATIONS - len(held):])
+	assert history.first() == GENERATIONS - len(held)
+
+
+@pytest.mark.parametrize("packed", [False, True])
+@pytest.mark.parametrize("mode, keep", [("dense", None), ("ring", 4), ("ring", 11), ("memmap", None)])
+@pytest.mark.parametrize("start, period", [(1, 1), (20, 3), (37, 5), (45, 9)])
+def test_fill_periodic(mode, keep, packed, start, period):
+	cycle = rows(start)[:period]
+	expected = rows()
+	expected[start:] = cycle[np.arange(GENERATIONS - start) % period]
+
+	history = make_history(mode, GENERATIONS, LENGTH, packed=packed, keep=keep)
+	for gen in range(start):
+		history[gen] = expected[gen]
+	# a ring has lost generation 0 by now (unless it is still short)
+	history.fill_periodic(start, cycle)
+
+	held = np.asarray(history)
+	np.testing.assert_array_equal(held, expected[GENERATIONS - len(held):])
+
+
+def test_ring_bounds():
+	history = RingHistory(GENERATIONS, LENGTH, keep=5)
+	history.write(0, rows()[:12])
+	assert (history.first(), history.latest) == (7, 11)
+	assert history.has(7) and not history.has(6)
+	with pytest.raises(IndexError):
+		history.rows(6, 8)
+	with pytest.raises(IndexError):
+		history.rows(10, 13)
+
+
+def test_unknown_mode():
+	with pytest.raises(ValueError):
+		make_history("sparse", GENERATIONS, LENGTH)
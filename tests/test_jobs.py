@@ -0,0 +1,111 @@
+"""the background job manager, with real worker processes."""
+import time
+
+import pytest
+
+import jobs
+from jobs import JobManager, QueueFull, RUNNING, DONE, CANCELLED, TIMED_OUT
+
+
+def work(seconds, value, progress=None):
+	# a job target: the workers import it from this module
+	progress(0.5)
+	time.sleep(seconds)
+
+	return value
+
+
+class Cache:
+
+	def __init__(self):
+		self.entries = {}
+
+	def get(self, key, default=None):
+		return self.entries.get(key, default)
+
+	def put(self, key, value):
+		self.entries[key] = value
+
+
+@pytest.fixture
+def manager():
+	# numpy is preloaded so the workers are started with this process's sys.path
+	manager = JobManager(workers=2, per_session=2, timeout=30.0, preload=["numpy"], cache=Cache())
+	yield manager
+	manager.shutdown()
+
+
+def wait_until(condition, timeout=30.0):
+	end = time.monotonic() + timeout
+	while not condition():
+		assert time.monotonic() < end, "timed out waiting"
+		time.sleep(0.02)
+
+
+def test_result_is_cached(manager):
+	job = manager.submit("a", work, (0.0, 7), key=("work", 7))
+	wait_until(lambda: job.finished)
+	assert (job.state, job.result, job.progress) == (DONE, 7, 1.0)
+	assert manager.cache.get(("work", 7)) == 7
+
+	again = manager.submit("b", work, (0.0, 7), key=("work", 7))
+	assert again.state == DONE and again.result == 7
+
+
+def test_shared_key(manager):
+	first = manager.submit("a", work, (1.0, 1), key=("shared",))
+	second = manager.submit("b", work, (1.0, 1), key=("shared",))
+	assert second is first
+	assert first.holders == {"a", "b"}
+
+	wait_until(lambda: first.finished)
+	assert (first.state, first.result) == (DONE, 1)
+
+
+def test_cancel_by_every_holder(manager):
+	job = manager.submit("a", work, (30.0, 1), key=("shared",))
+	assert manager.submit("b", work, (30.0, 1), key=("shared",)) is job
+	wait_until(lambda: job.state == RUNNING)
+
+	manager.cancel(job.id, "a")
+	time.sleep(0.3)
+	assert job.state == RUNNING and job.holders == {"b"}
+
+	manager.cancel(job.id, "b")
+	assert job.state == CANCELLED
+	assert not job._process.is_alive()
+	assert manager.cache.get(("shared",)) is None
+
+
+def test_timeout(manager):
+	job = manager.submit("a", work, (30.0, 1), timeout=0.5)
+	wait_until(lambda: job.finished)
+	assert job.state == TIMED_OUT
+	assert not job._process.is_alive()
+
+
+def test_runs_after_cancel(manager, monkeypatch):
+	# cancelling closes the job's connection, possibly just before the dispatcher waits
+	# on it; a slower wait makes sure that happens
+	wait = jobs.wait
+	monkeypatch.setattr(jobs, "wait", lambda conns, timeout: time.sleep(0.1) or wait(conns, timeout))
+	for i in range(5):
+		job = manager.submit("a", work, (30.0, i))
+		wait_until(lambda: job.state == RUNNING)
+		time.sleep(0.05 * i)
+		manager.cancel(job.id, "a")
+		assert job.state == CANCELLED
+
+	job = manager.submit("a", work, (0.0, "after"))
+	wait_until(lambda: job.finished)
+	assert (job.state, job.result) == (DONE, "after")
+	assert manager._thread.is_alive()
+
+
+def test_queue_full(manager):
+	manager.submit("a", work, (30.0, 1))
+	manager.submit("a", work, (30.0, 2))
+	with pytest.raises(QueueFull):
+		manager.submit("a", work, (30.0, 3))
+	# other sessions still get in
+	manager.submit("b", work, (30.0, 4))
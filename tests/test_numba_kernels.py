@@ -0,0 +1,52 @@
+"""the compiled backend against the numpy one (skipped without numba)."""
+import numpy as np
+import pytest
+
+pytest.importorskip("numba")
+
+import kernels
+import numba_kernels
+from ensemble import run_ensemble
+import backend
+
+
+@pytest.mark.parametrize("length", [1, 2, 3, 5, 63, 64, 65, 301])
+def test_eca_step(length):
+	rows = np.random.default_rng(length).integers(0, 2, (8, length), dtype=np.uint8)
+	for rule in range(256):
+		table = kernels.rule_table(rule)
+		assert np.array_equal(numba_kernels.eca_step(rows, table), kernels.eca_step(rows, table))
+
+
+@pytest.mark.parametrize("j, k", [(1, 3), (2, 5), (3, 1), (7, 7)])
+def test_gkl_step(j, k):
+	rows = np.random.default_rng(j * 10 + k).integers(0, 2, (8, 149), dtype=np.uint8)
+	out = np.empty_like(rows)
+	numba_kernels.gkl_step(rows, j, k, out=out)
+	assert np.array_equal(out, kernels.gkl_step(rows, j, k))
+
+
+@pytest.mark.parametrize("length", [1, 2, 3, 6, 7, 12])
+def test_gkl_step_short(length):
+	# offsets as large as the row or larger, and rows with no cell clear of both ends
+	rows = np.random.default_rng(length).integers(0, 2, (4, length), dtype=np.uint8)
+	for j in range(2 * length + 2):
+		for k in range(2 * length + 2):
+			assert np.array_equal(numba_kernels.gkl_step(rows, j, k), kernels.gkl_step(rows, j, k)), (j, k)
+
+
+@pytest.mark.parametrize("j, k", [(1, 3), (2, 6), (3, 150)])
+def test_gkl_ensemble(j, k):
+	rng = np.random.default_rng(0)
+	ivs = (rng.uniform(0, 1, (200, 149)) < rng.uniform(0, 1, (200, 1))).astype(np.uint8)
+
+	selected = backend._selected
+	backend.set_backend("numpy")
+	try:
+		expected = run_ensemble(ivs, j, k, 300)
+	finally:
+		backend._selected = selected
+	densities, steps = numba_kernels.gkl_ensemble(ivs, j, k, 300)
+
+	assert np.array_equal(densities, expected[0])
+	assert np.array_equal(steps, expected[1])
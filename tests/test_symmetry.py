@@ -0,0 +1,63 @@
+"""the symmetry classes, and rule sweeps that use them against brute force."""
+import numpy as np
+import pytest
+
+from kernels import eca_step, rule_table
+from rulespace import _plan, sweep_rules, symmetric_batch
+from symmetry import canonical, classes, transform_cells, IDENTITY, REFLECT
+
+
+def history(rule, iv, generations=40):
+	rows = [np.asarray(iv, dtype=np.uint8)]
+	table = rule_table(rule)
+	for _ in range(generations - 1):
+		rows.append(eca_step(rows[-1], table))
+
+	return np.stack(rows)
+
+
+def assert_same_sweep(ivs, rules, generations):
+	derived = sweep_rules(ivs, rules, generations, symmetry=True)
+	direct = sweep_rules(ivs, rules, generations, symmetry=False)
+	assert derived.keys() == direct.keys()
+	for column in direct:
+		np.testing.assert_array_equal(derived[column], direct[column], err_msg=column)
+
+
+def test_classes():
+	found = classes()
+	assert len(found) == 88
+	assert sorted(rule for members in found.values() for rule in members) == list(range(256))
+	for rep, members in found.items():
+		assert rep == min(members)
+		assert all(canonical(rule)[0] == rep for rule in members)
+
+
+@pytest.mark.parametrize("length", [1, 2, 8, 31, 64])
+def test_history_from_representative(length):
+	# what Page2 does for a rule that is not its class representative
+	iv = np.random.default_rng(length).integers(0, 2, length, dtype=np.uint8)
+	for rule in range(256):
+		rep, t = canonical(rule)
+		np.testing.assert_array_equal(history(rule, iv), transform_cells(history(rep, transform_cells(iv, t)), t), err_msg=str(rule))
+
+
+def test_sweep_symmetric_batch():
+	ivs = symmetric_batch(np.random.default_rng(1).integers(0, 2, (6, 23), dtype=np.uint8))
+	evolved, _, _ = _plan(ivs, list(range(256)), True)
+	assert len(evolved) == 88
+
+	assert_same_sweep(ivs, range(256), 64)
+
+
+def test_sweep_other_batch():
+	# half of the rows have their reflection in the batch, and the rules come with their
+	# reflections, so deriving from the representatives is still cheaper than running every rule
+	rng = np.random.default_rng(2)
+	ivs = rng.integers(0, 2, (8, 29), dtype=np.uint8)
+	ivs = np.concatenate([ivs, transform_cells(ivs[:4], REFLECT)])
+	rules = sorted(rule for members in list(classes().values())[::4] for rule in members if canonical(rule)[1] in (IDENTITY, REFLECT))
+	evolved, _, _ = _plan(ivs, rules, True)
+	assert len(evolved) < len(rules)
+
+	assert_same_sweep(ivs, rules, 64)
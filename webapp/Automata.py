@@ -1,3 +1,9 @@
+import os
+import sys
+
+# the simulation kernels are shared with the scripts
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "scripts"))
+
 import Page1
 import Page2
 import Page3
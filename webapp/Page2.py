@@ -4,61 +4,15 @@ import numpy as np
 from PIL import Image
 import base64
 import random
-import os
 
+from symmetry import canonical
+from background import too_large
+from engines import run_eca, show_stats, plot_sim
 
-def app():
-	class E_CA:
-
-		def __init__(self, length, IV, ruleset, gens):
-			self.ruleset = ruleset
-			self.length = length
-			self.cells = IV
-			self.generations = gens
-			
-		def rule_id(self, triple):
-			L, C, R = triple
-			s = str(int(L)) + str(int(C)) + str(int(R))
-			index = int(s, 2) # parse a binary number not decimal
-
-			return index
-
-		def run_automaton(self):
-			ruleset = self.ruleset
-
-			history = np.zeros((self.generations, self.length)) # 2D array
-			#print(history.shape)
-			history[0, :] = self.cells # start here
-
-			for gen in range(1, self.generations):
-				all_triples = np.stack(
-					[
-					np.roll(history[gen - 1, :], 1),
-					history[gen - 1, :],
-					np.roll(history[gen - 1, :], -1)
-					]
-					)
-				#print(np.apply_along_axis(self.rule_id, 0, all_triples))
-
-				temp = []
-				for i in np.apply_along_axis(self.rule_id, 0, all_triples):
-					temp.append(ruleset[i])
-
-				temp = np.array(temp, dtype=np.int64)
 
-				history[gen, :] = temp
-
-			return history, None, None	
-
-	def plot_sim(data):
-		import matplotlib.pyplot as plt 
-		plt.rcParams['image.cmap'] = 'binary'
-
-		fig, ax = plt.subplots(figsize=(16, 9))
-		ax.matshow(data)
-		ax.axis(False)
-
-		st.pyplot(fig)
+def app():
+	diagnostics = st.sidebar.checkbox("Show run diagnostics")
+	streaming = st.sidebar.checkbox("Draw generations as they are computed", True)
 
 	st.title("Explore Elementary Cellular Automata")
 
@@ -83,15 +37,9 @@ def app():
 		st.write("""
 			Invalid entry, enter an integer within range.
 			""")
-
-	f_path = os.path.join(os.path.dirname(__file__), 'rules.txt')
-	f = open(f_path, "r")
-
-	ruleset_str = f.readlines()[rule][: : -1] #reversing to avoid incorrect mapping
-	#print(ruleset_str)
-	ruleset = [char for char in ruleset_str][1:] # first char in this list is '\n' so reading from char 2 on
-	#print(self.ruleset)
-	f.close()	
+	elif canonical(rule)[0] != rule:
+		rep, t = canonical(rule)
+		st.caption(f"Rule {rule} is rule {rep} under the {t} symmetry (and is computed from it).")
 
 	IV_choice = st.selectbox("Choose from the following options of IVs:", ("random", "only central cell is 1", "only central cell is 0", "enter my own IV"))
 
@@ -120,10 +68,15 @@ def app():
 		length = len(IV)
 
 
-	if st.button("Run"):
-		CA = E_CA(length, IV, ruleset, gens)
-		data, _, _ = CA.run_automaton()
-		plot_sim(data)	
+	if st.button("Run") and not too_large(gens, length):
+		placeholder = st.empty()
+		result = run_eca(rule, IV, gens, diagnostics, placeholder if streaming else None)
+		if result is not None:
+			data, transient, period, stats = result
+			plot_sim(data, placeholder)
+			show_stats(stats if diagnostics else None)
+			if period:
+				st.write(f"The automaton falls into a cycle of period ${period}$ after ${transient}$ generations.")
 
 
 	st.markdown("""---""")
@@ -3,121 +3,64 @@ import pandas as pd
 import numpy as np 
 from PIL import Image
 import base64
-import random
-import math 
 import os 
 
-def app():
-	class E_CA:
-
-		def __init__(self, length, IV, ruleset, gens):
-			self.ruleset = ruleset
-			self.length = length
-			self.cells = IV
-			self.generations = gens
-			
-		def rule_id(self, triple):
-			L, C, R = triple
-			s = str(int(L)) + str(int(C)) + str(int(R))
-			index = int(s, 2) # parse a binary number not decimal
-
-			return index
-
-		def run_automaton(self):
-			ruleset = self.ruleset
-
-			history = np.zeros((self.generations, self.length)) # 2D array
-			#print(history.shape)
-			history[0, :] = self.cells # start here
-
-			for gen in range(1, self.generations):
-				all_triples = np.stack(
-					[
-					np.roll(history[gen - 1, :], 1),
-					history[gen - 1, :],
-					np.roll(history[gen - 1, :], -1)
-					]
-					)
-				#print(np.apply_along_axis(self.rule_id, 0, all_triples))
-
-				temp = []
-				for i in np.apply_along_axis(self.rule_id, 0, all_triples):
-					temp.append(ruleset[i])
-
-				temp = np.array(temp, dtype=np.int64)
-
-				history[gen, :] = temp
-
-			return history, None, None	
+from backend import get_backend
+from ivgen import exact_density_ivs
+from dynamics import evolve
+from history import make_history
+from memo import iv_key
+from instrument import RunStats
+from background import run_job, too_large
+from engines import run_eca, show_stats, plot_sim, stream_to
+from readout import rule184_readout, UNDECIDED, UNRELAXED
 
-	class GKL_CA:
 
-		def __init__(self, length, IV, density):
-			self.length = length
-			self.cells = IV
-			# self.limit_evolution = 0
-			# density => density of 1s in the state array
-			self.density = density
+class GKL_CA:
 
+	def __init__(self, length, IV, density):
+		self.length = length
+		self.cells = IV
+		# self.limit_evolution = 0
+		# density => density of 1s in the state array
+		self.density = density
+		self.stats = None # optional instrument.RunStats
 
-		def apply_rule(self, quintuple):
-			m3, m1, x, p1, p3 = quintuple
-			x_ = 0
 
-			if x == 0:
-				# maj(m3, m1, x)
-				x_ = int(math.floor(0.5 * (m3 + m1 + x)))
-			else:
-				# maj(x, p1, p3)
-				x_ = int(math.floor(0.5 * (x + p1 + p3)))
-
-			return x_
-
-
-		def run_automaton(self, j = 1, k = 3):
-			history = np.zeros((600, self.length)) # 2D array
-			#print(history.shape)
-			history[0, :] = self.cells # start here
-
-			density = self.density #this will change with evolution
-			
-			ctr, step_ctr = 1, 0		 
-			while (ctr < 600):
-				# not converged yet
-				all_quintuples = np.stack(
-					[np.roll(history[ctr-1, :], -k),
-					 np.roll(history[ctr-1, :], -j),
-					 history[ctr-1, :],
-					 np.roll(history[ctr-1, :], j),
-					 np.roll(history[ctr-1, :], k)
-					]
-					)
-				arr = []
-				for i in np.apply_along_axis(self.apply_rule, 0, all_quintuples):
-					arr.append(i)
+	def run_automaton(self, j = 1, k = 3, progress=None):
+		# progress(rows), if given, is called with the generations computed so far as they grow
+		history = make_history("dense", 600, self.length) # uint8, see history.py
+		history[0] = self.cells # start here
 
-				history[ctr, :] = np.array(arr, dtype=np.int64)
+		# stops stepping once the run converges (or cycles); the rest of the 600 rows are copied
+		step = get_backend().gkl_step
+		grown = (lambda filled: progress(np.asarray(history)[:filled])) if progress else None
+		self.transient, self.period, counts = evolve(history, lambda prev, out=None: step(prev, j, k, out=out), self.stats, grown)
 
+		density = counts[-1] / self.length
+		step_ctr = int(np.count_nonzero((counts[1:] != 0) & (counts[1:] != self.length)))
 
-				#calculate the new density
-				density = np.count_nonzero(history[ctr, :] == 1)/self.length
-				ctr += 1	
+		return np.asarray(history), density, step_ctr			
 
-				if (density != 1 and density != 0): step_ctr += 1		
 
-			return history, density, step_ctr			
+def gkl_job(IV, density, j, k, diagnostics=False, partial=False, progress=None):
+	# body of a background job like engines.eca_job: (history, final density, steps to converge, stats)
+	stats = RunStats(trace_memory=True) if diagnostics else None
+	CA = GKL_CA(len(IV), IV, density)
+	CA.stats = stats
+	data, density, step_ctr = CA.run_automaton(j=j, k=k, progress=progress and (lambda rows: progress(len(rows) / 600, rows if partial else None)))
 
+	return data, density, step_ctr, stats
 
-	def plot_sim(data):
-		import matplotlib.pyplot as plt 
-		plt.rcParams['image.cmap'] = 'binary'
 
-		fig, ax = plt.subplots(figsize=(16, 9))
-		ax.matshow(data)
-		ax.axis(False)
+def run_gkl(IV, density, j, k, diagnostics=False, placeholder=None):
+	# (history, final density, steps to converge, stats), run (and drawn as it grows) like run_eca
+	return run_job("gkl", gkl_job, (IV, density, int(j), int(k), diagnostics, placeholder is not None), key=("gkl", (int(j), int(k)), iv_key(IV), 600), refresh=diagnostics, draw=stream_to(placeholder))
 
-		st.pyplot(fig)
 
+def app():
+	diagnostics = st.sidebar.checkbox("Show run diagnostics")
+	streaming = st.sidebar.checkbox("Draw generations as they are computed", True)
 
 	st.title("The Majority Problem / Density Classification")
 
@@ -186,13 +129,16 @@ def app():
 	i = st.number_input("Enter position of first neighbour on the left/right (j): ", 1)
 	j = st.number_input("Enter position of second neighbour on the left/right (k): ", 3)
 	if st.button('Run!'):
-		GKL_modif = GKL_CA(len(IV_fixed), IV_fixed, 0.5088127064374639)
-		data, mjrt, ctr = GKL_modif.run_automaton(j=int(i), k=int(j))
-		plot_sim(data)
-		if ctr < 599:
-			st.write(f"The predicted majority element is ${int(mjrt)}$ and the classifier converges in ${ctr}$ steps.\n The true majority element is ${1}$")
-		else:
-			st.write("The classifier did not converge.")
+		placeholder = st.empty()
+		result = run_gkl(IV_fixed, 0.5088127064374639, int(i), int(j), diagnostics, placeholder if streaming else None)
+		if result is not None:
+			data, mjrt, ctr, stats = result
+			plot_sim(data, placeholder)
+			show_stats(stats if diagnostics else None)
+			if ctr < 599:
+				st.write(f"The predicted majority element is ${int(mjrt)}$ and the classifier converges in ${ctr}$ steps.\n The true majority element is ${1}$")
+			else:
+				st.write("The classifier did not converge.")
 
 
 
@@ -231,10 +177,6 @@ def app():
 	density = st.slider("Enter the density of 1s in your IV:", 0.0, 1.0, step=0.0001)
 
 
-	ruleset_str = "10111000"
-	ruleset = [char for char in ruleset_str[: : -1]]
-
-
 	length = st.number_input("Enter the length of your IV (between 300-500):", 300)
 	if type(length) != int or length > 500 or length < 300: 
 		st.write("""
@@ -243,27 +185,36 @@ def app():
 
 
 	majority = 1 if density > 0.5 else 0 if density < 0.5 else None # find majority element
-	freq = (int)(density*length)
-	arr = [1]*freq
-	arr2 = [0]*(length-freq)
-	arr += arr2
-	IV = np.array(random.sample(arr, length))
+	IV = exact_density_ivs([density], length)[0]
 		
 	st.write("IV: ", np.array2string(IV))
 
-	if st.button("Run both!"):
+	if st.button("Run both!") and not too_large(int(0.7*length), length):
 		st.write("Output of Rule 184:")
-		CA_184 = E_CA(length, IV, ruleset, int(0.7*length))
-		data_184, _, _ = CA_184.run_automaton()
-		plot_sim(data_184)
-		st.write(f"The majority element is {int(majority)} and the classifier predicted {int(majority)}.") #for now.
+		placeholder = st.empty()
+		result = run_eca(184, IV, int(0.7*length), diagnostics, placeholder if streaming else None)
+		if result is not None:
+			data_184, _, _, stats = result
+			plot_sim(data_184, placeholder)
+			show_stats(stats if diagnostics else None)
+			# blocks of two or more equal cells in the relaxed configuration give the majority, see readout.py
+			predicted = rule184_readout(data_184[-1])[0]
+			if predicted == UNDECIDED:
+				st.write(f"The majority element is {majority} and the classifier found no block of two equal cells, i.e. a density of $0.5$.")
+			elif predicted == UNRELAXED:
+				st.write(f"The majority element is {majority} and the classifier found blocks of both symbols: the run has not relaxed yet, so it cannot tell.")
+			else:
+				st.write(f"The majority element is {majority} and the classifier predicted {predicted}.")
 
 
 		st.write("Output of the GKL Classifier:")	
-		CA_GKL = GKL_CA(length, IV, density)
-		data_GKL, density_, ctr = CA_GKL.run_automaton(j=1, k = 3)
-		plot_sim(data_GKL)
-		st.write(f"The predicted majority element is {int(density_)} and the classifier converges in {ctr} steps.\n The true majority element is {int(majority)}")
+		placeholder = st.empty()
+		result = run_gkl(IV, density, 1, 3, diagnostics, placeholder if streaming else None)
+		if result is not None:
+			data_GKL, density_, ctr, stats = result
+			plot_sim(data_GKL, placeholder)
+			show_stats(stats if diagnostics else None)
+			st.write(f"The predicted majority element is {int(density_)} and the classifier converges in {ctr} steps.\n The true majority element is {int(majority)}")
 	  
 
 	st.write("""
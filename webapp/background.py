@@ -0,0 +1,70 @@
+import time
+import uuid
+
+import streamlit as st
+
+from jobs import JobManager, QueueFull, DONE, QUEUED
+
+# simulations run in a pool of worker processes shared by every session (like memo.results),
+# so a long run holds one worker rather than a script thread, and can be stopped.
+# the workers start with the job targets (and numpy) already imported, see jobs.py
+jobs = JobManager(per_session=2, timeout=120.0, preload=["numpy", "engines", "Page3"])
+
+# the largest gens x length a run may ask for (one byte per cell of the history)
+MAX_CELLS = 25_000_000
+
+
+def session_id():
+	if "session" not in st.session_state:
+		st.session_state["session"] = uuid.uuid4().hex
+
+	return st.session_state["session"]
+
+
+def too_large(gens, length):
+	# refuses (with a message) runs whose history would not fit the cap
+	if int(gens) * int(length) > MAX_CELLS:
+		st.error(f"That run has {int(gens) * int(length):,} cells; please keep generations x length below {MAX_CELLS:,}.")
+		return True
+
+	return False
+
+
+def run_job(slot, fn, args, key=None, refresh=False, draw=None):
+	# runs fn(*args) as a background job of this session and waits for it, with a progress
+	# bar and a cancel button; draw(partial), if given, shows the partial results as they
+	# come. returns the result, or None (after saying why) if the job did not finish.
+	# any rerun of the script -- the cancel button or a changed input -- cancels the job
+	# (unless another session is waiting for the same run)
+	session = session_id()
+	try:
+		job = jobs.submit(session, fn, args, key=key, refresh=refresh, slot=slot)
+	except QueueFull as e:
+		st.error(f"Too many runs at once ({e}); please wait for them to finish.")
+		return None
+
+	if not job.finished:
+		cancel = st.empty()
+		cancel.button("Cancel", key=f"cancel-{job.id}")
+		bar = st.progress(0.0)
+		drawn = None
+		try:
+			while not job.finished:
+				bar.progress(job.progress, "Waiting for a free worker..." if job.state == QUEUED else f"Running: {job.progress:.0%}")
+				partial = job.partial
+				if draw is not None and partial is not None and partial is not drawn:
+					draw(partial)
+					drawn = partial
+				time.sleep(0.1)
+		except BaseException:
+			# streamlit stops the script by raising from its next call
+			jobs.cancel(job.id, session)
+			raise
+		cancel.empty()
+		bar.empty()
+
+	if job.state != DONE:
+		st.warning(f"The run {job.state}" + (f": {job.error}." if job.error else "."))
+		return None
+
+	return job.result
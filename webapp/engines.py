@@ -0,0 +1,90 @@
+import numpy as np
+import streamlit as st
+
+from kernels import rule_table
+from backend import get_backend
+from dynamics import evolve
+from history import make_history
+from memo import iv_key
+from symmetry import canonical, transform_cells, IDENTITY
+from render import render_png
+from instrument import RunStats
+from background import run_job
+
+# the ECA run and the drawing shared by both pages. eca_job is the one job target for
+# every ECA run, whichever page asks for it (the workers import it from here)
+
+
+class E_CA:
+
+	def __init__(self, length, IV, ruleset, gens):
+		self.ruleset = ruleset
+		self.length = length
+		self.cells = IV
+		self.generations = gens
+		self.stats = None # optional instrument.RunStats
+		
+	def run_automaton(self, progress=None):
+		# progress(rows), if given, is called with the generations computed so far as they grow
+		table = self.ruleset # uint8 lookup table, see kernels.rule_table
+
+		history = make_history("dense", self.generations, self.length) # uint8, see history.py
+		history[0] = self.cells # start here
+
+		# neighbourhood index 4*L + 2*C + R looked up in the rule table for the whole row,
+		# stopping early (and copying the cycle) once the run falls into a fixed point or cycle
+		step = get_backend().eca_step
+		grown = (lambda filled: progress(np.asarray(history)[:filled])) if progress else None
+		self.transient, self.period, _ = evolve(history, lambda prev, out=None: step(prev, table, out=out), self.stats, grown)
+
+		return np.asarray(history), None, None	
+
+
+def eca_job(rule, IV, gens, diagnostics=False, partial=False, progress=None):
+	# body of a background job, see background.py: (history, transient, period, stats), with
+	# stats only for diagnostics. progress gets the fraction of the generations done so far
+	# and, with partial, the rows themselves
+	stats = RunStats(trace_memory=True) if diagnostics else None
+	CA = E_CA(len(IV), IV, rule_table(rule), gens)
+	CA.stats = stats
+	data, _, _ = CA.run_automaton(progress and (lambda rows: progress(len(rows) / gens, rows if partial else None)))
+
+	return data, CA.transient, CA.period, stats
+
+
+def run_eca(rule, IV, gens, diagnostics=False, placeholder=None):
+	# (history, transient, period, stats) from a background job, or None if it did not finish.
+	# results are shared across reruns and sessions through memo.results; instrumented runs
+	# are always recomputed so there is something to measure.
+	# only class representatives are run and cached, see symmetry.py: rule is rep under the
+	# transform t, so its history is rep's history on the transformed IV, transformed back.
+	# with a placeholder, a run that is not cached is drawn into it as it grows
+	rep, t = canonical(int(rule))
+	rep_IV = transform_cells(IV, t)
+
+	result = run_job("eca", eca_job, (rep, rep_IV, int(gens), diagnostics, placeholder is not None), key=("eca", rep, iv_key(rep_IV), int(gens)), refresh=diagnostics, draw=stream_to(placeholder, t))
+	if result is None:
+		return None
+	data, transient, period, stats = result
+
+	return transform_cells(data, t), transient, period, stats
+
+
+def show_stats(stats):
+	if stats is not None:
+		st.expander("Run diagnostics").text(stats.report())
+
+
+def plot_sim(data, target=st):
+	# the history goes straight to a 1-bit PNG (downsampled if needed), see render.py
+	target.image(render_png(data))
+
+
+def stream_to(placeholder, t=IDENTITY):
+	# draws the rows a job has computed so far (mapped back through the symmetry transform t)
+	# into placeholder. if an input changes meanwhile, streamlit stops the script and the
+	# job is cancelled, so nothing half-done is cached
+	if placeholder is None:
+		return None
+
+	return lambda rows: plot_sim(transform_cells(rows, t), placeholder)